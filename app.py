@@ -1,6 +1,8 @@
 import streamlit as st
 import leafmap.foliumap as leafmap
 
+import tile_proxy
+
 st.set_page_config(layout="wide")
 
 # Customize the sidebar
@@ -36,5 +38,5 @@ markdown = """
 st.markdown(markdown)
 
 m = leafmap.Map(minimap_control=True)
-m.add_basemap("OpenTopoMap")
+tile_proxy.add_basemap(m, "OpenTopoMap")
 m.to_streamlit(height=500)
@@ -0,0 +1,45 @@
+"""Small HTTP servers run next to the Streamlit app.
+
+The vector tile server (vector_tiles.py) and the basemap tile proxy
+(tile_proxy.py) both start in-process on first use, in a daemon thread, and
+can also run as their own service. Each module wraps its own handler:
+
+    def make_server(store=None, host=SERVER_HOST, port=SERVER_PORT):
+        return background_server.make_server(_TileHandler, host, port, store=store or open_tile_store())
+
+    _server = background_server.BackgroundServer(make_server)
+    _server.ensure(store)
+"""
+import threading
+from http.server import ThreadingHTTPServer
+
+
+def make_server(handler_class, host, port, **attributes):
+    """ThreadingHTTPServer on ``host``:``port`` whose handlers see ``attributes`` as class attributes."""
+    handler = type(handler_class.__name__.lstrip('_'), (handler_class,), attributes)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+class BackgroundServer:
+    """A server started in a background thread, once per process."""
+
+    def __init__(self, make_server):
+        self.make_server = make_server
+        self.server = None
+        self._lock = threading.Lock()
+
+    def ensure(self, *args):
+        """The running server, started with ``make_server(*args)`` on the first call.
+
+        If the port is already taken we assume the same service is listening
+        there (run on its own or by another app process), use that one and
+        return None.
+        """
+        with self._lock:
+            if self.server is None:
+                try:
+                    self.server = self.make_server(*args)
+                except OSError:
+                    return None
+                threading.Thread(target=self.server.serve_forever, daemon=True).start()
+            return self.server
@@ -0,0 +1,164 @@
+"""End-to-end rerun benchmark of the Streamlit pages, run headless with AppTest.
+
+Drives every page of app_pages.py (Dashboard, Maps, Customer Sales Trend)
+and dashboard.render_dashboard through each sidebar combination against the
+offline fixture store. Outbound network access is blocked for the whole
+run. For every interaction it records the rerun wall time, the peak Python
+memory allocated during the rerun (tracemalloc) and the size of the
+rendered element protos, a proxy for what is sent to the browser.
+
+    python benchmarks/bench_apptest.py --save baseline.json
+    python benchmarks/bench_apptest.py --baseline baseline.json --max-regression 0.25
+
+With --baseline the run exits non-zero if the wall time, peak memory or
+payload of any interaction grows past the threshold.
+"""
+import argparse
+import itertools
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import fixtures
+
+REPO_ROOT = fixtures.REPO_ROOT
+METRICS = ('seconds', 'peak_mb', 'payload_kb')
+
+
+class NetworkBlocked(OSError):
+    pass
+
+
+def block_network():
+    """Refuse every non-loopback connection for the rest of the process."""
+    original_connect = socket.socket.connect
+
+    def guarded_connect(self, address):
+        host = address[0] if isinstance(address, tuple) else address
+        if host not in ('127.0.0.1', 'localhost', '::1') and self.family != socket.AF_UNIX:
+            raise NetworkBlocked(f"Network access is disabled in benchmarks: {address!r}")
+        return original_connect(self, address)
+
+    socket.socket.connect = guarded_connect
+
+
+def payload_bytes(node):
+    """Serialized size of every element proto under ``node``."""
+    total = 0
+    proto = getattr(node, 'proto', None)
+    if proto is not None and hasattr(proto, 'ByteSize'):
+        total += proto.ByteSize()
+    for child in getattr(node, 'children', {}).values():
+        total += payload_bytes(child)
+    return total
+
+
+def measure(at):
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    at.run(timeout=120)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    if at.exception:
+        raise RuntimeError(f"App raised: {at.exception[0].value}")
+    return {'seconds': seconds, 'peak_mb': peak / 1024 ** 2, 'payload_kb': payload_bytes(at._tree) / 1024}
+
+
+def selectbox(at, label):
+    return next(box for box in at.sidebar.selectbox if box.label == label)
+
+
+def map_interactions(at, prefix):
+    """Walk every Year / View Type / Risk Type combination on the current page."""
+    import map_engine
+    import risk_data
+
+    results = {}
+    for year, view_type, risk_type in itertools.product(
+            risk_data.available_years(), map_engine.VIEW_TYPES, map_engine.RISK_TYPES):
+        selectbox(at, 'Select Year').set_value(year)
+        selectbox(at, 'Select View Type').set_value(view_type)
+        selectbox(at, 'Select Risk Type').set_value(risk_type)
+        results[f"{prefix}[{year},{view_type},{risk_type}]"] = measure(at)
+    return results
+
+
+def _render_dashboard_script():
+    import dashboard
+    dashboard.render_dashboard()
+
+
+def run():
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+
+    at = AppTest.from_file(os.path.join(REPO_ROOT, 'app_pages.py'), default_timeout=120)
+    results['app_pages.initial'] = measure(at)
+    for page in ('Dashboard', 'Maps', 'Customer Sales Trend'):
+        at.sidebar.radio[0].set_value(page)
+        results[f"app_pages.{page}"] = measure(at)
+        if page == 'Maps':
+            results.update(map_interactions(at, 'app_pages.Maps'))
+
+    at = AppTest.from_function(_render_dashboard_script, default_timeout=120)
+    results['render_dashboard.initial'] = measure(at)
+    results.update(map_interactions(at, 'render_dashboard'))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--save', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against results saved with --save')
+    parser.add_argument('--max-regression', type=float, default=0.25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store_dir = fixtures.seed_store(os.path.join(tmp_dir, 'boundaries'))
+        # Must be set before the app modules are imported, they read it at import time
+        os.environ.update({
+            'BOUNDARY_STORE_DIR': store_dir,
+            'BOUNDARY_STORE_OFFLINE': '1',
+            'RENDER_CACHE_DIR': os.path.join(tmp_dir, 'render_cache'),
+            'VECTOR_TILE_DIR': os.path.join(tmp_dir, 'tiles'),
+        })
+        # fixtures has already imported boundary_store with the defaults
+        fixtures.boundary_store.STORE_DIR = store_dir
+        fixtures.boundary_store.OFFLINE = True
+        block_network()
+        tracemalloc.start()
+        results = run()
+        tracemalloc.stop()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    failed = []
+    print(f"{'interaction':<52}{'s':>8}{'peak MB':>9}{'KB':>9}")
+    for name, metrics in results.items():
+        line = f"{name:<52}{metrics['seconds']:>8.3f}{metrics['peak_mb']:>9.1f}{metrics['payload_kb']:>9.0f}"
+        regressed = [m for m in METRICS if name in baseline and baseline[name][m] > 0
+                     and metrics[m] / baseline[name][m] - 1 > args.max_regression]
+        if regressed:
+            failed.append(name)
+            line += '  REGRESSION: ' + ', '.join(regressed)
+        print(line)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if failed:
+        print(f"{len(failed)} interaction(s) regressed more than {args.max_regression:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""Soak test of the Customer Sales Trend page: memory must stay flat over many reruns.
+
+Reruns app_pages.customer_sales_trend headless with AppTest, once per chart
+backend, and samples traced Python memory, RSS and the number of open
+matplotlib figures every ``--every`` reruns. After ``--warmup`` reruns
+(caches filled) the traced memory may not grow by more than
+``--max-growth-mb`` and no figure may stay open; the run exits non-zero
+otherwise.
+
+    python benchmarks/bench_chart_soak.py --reruns 5000
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import tracemalloc
+
+import fixtures
+
+PAGE_SCRIPT = 'import app_pages\napp_pages.customer_sales_trend()'
+
+
+def open_figures():
+    if 'matplotlib.pyplot' not in sys.modules:
+        return 0
+    return len(sys.modules['matplotlib.pyplot'].get_fignums())
+
+
+def soak(backend, reruns, warmup, every):
+    from streamlit.testing.v1 import AppTest
+
+    import charts
+
+    charts.BACKEND = backend
+    at = AppTest.from_string(PAGE_SCRIPT, default_timeout=120)
+    samples = []
+    for i in range(1, reruns + 1):
+        at.run()
+        if at.exception:
+            raise RuntimeError(f"Page raised: {at.exception[0].value}")
+        if i >= warmup and (i - warmup) % every == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            # ru_maxrss is in KB on Linux
+            samples.append((i, current / 1024 ** 2,
+                            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, open_figures()))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reruns', type=int, default=2000)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--every', type=int, default=250)
+    parser.add_argument('--max-growth-mb', type=float, default=5.0)
+    parser.add_argument('--backends', nargs='+', default=['altair', 'png'])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store_dir = fixtures.seed_store(os.path.join(tmp_dir, 'boundaries'))
+        # fixtures has already imported boundary_store with the defaults
+        fixtures.boundary_store.STORE_DIR = store_dir
+        fixtures.boundary_store.OFFLINE = True
+        tracemalloc.start()
+
+        failed = False
+        for backend in args.backends:
+            samples = soak(backend, args.reruns, args.warmup, args.every)
+            print(f"{backend}: {'rerun':>8}{'traced MB':>11}{'RSS MB':>9}{'figures':>9}")
+            for i, traced, rss, figures in samples:
+                print(f"{'':>{len(backend) + 2}}{i:>8}{traced:>11.1f}{rss:>9.0f}{figures:>9}")
+            growth = samples[-1][1] - samples[0][1]
+            leaked = max(sample[3] for sample in samples)
+            if growth > args.max_growth_mb or leaked:
+                failed = True
+                print(f"{backend}: FAIL, traced memory grew {growth:.1f} MB, {leaked} figure(s) open")
+            else:
+                print(f"{backend}: ok, traced memory grew {growth:.1f} MB")
+        tracemalloc.stop()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
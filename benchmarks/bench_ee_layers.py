@@ -0,0 +1,139 @@
+"""NLCD layer resolution against a local Earth Engine stand-in: serial vs ee_layers.
+
+``LocalEarthEngine`` mimics the parts of the ``ee`` client the NLCD page
+uses, with a fixed ``--latency`` per ``getMapId`` round trip. Compares the
+old serial per-rerun resolution with ``ee_layers.LayerResolver`` on a cold
+rerun, a warm rerun, concurrent sessions and after the TTL runs out, and
+checks the number of remote calls each one makes. Needs no credentials or
+network; exits non-zero if a check fails.
+
+    python benchmarks/bench_ee_layers.py --latency 0.3
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ee_layers  # noqa: E402
+
+YEARS = ["2001", "2004", "2006", "2008", "2011", "2013", "2016", "2019"]
+
+
+class LocalEarthEngine:
+    """Stand-in for the ``ee`` module: builds images locally, sleeps on getMapId."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.Filter = SimpleNamespace(eq=lambda name, value: (name, value))
+
+    def ImageCollection(self, name):
+        return _Image(self, name)
+
+    def get_map_id(self, description):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return {'tile_fetcher': SimpleNamespace(
+            url_format=f"https://earthengine.local/{abs(hash(description))}/{{z}}/{{x}}/{{y}}")}
+
+
+class _Image:
+
+    def __init__(self, client, description):
+        self.client = client
+        self.description = description
+
+    def filter(self, condition):
+        return _Image(self.client, f"{self.description}|{condition}")
+
+    def first(self):
+        return _Image(self.client, f"{self.description}|first")
+
+    def select(self, band):
+        return _Image(self.client, f"{self.description}|{band}")
+
+    def getMapId(self, vis_params):
+        return self.client.get_map_id((self.description, repr(vis_params)))
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def serial_rerun(client, years):
+    # What the page did before: one blocking round trip per year on every rerun
+    return {year: ee_layers.nlcd_image(client, year).getMapId({})['tile_fetcher'].url_format for year in years}
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.2, help='Seconds per getMapId round trip')
+    parser.add_argument('--sessions', type=int, default=8)
+    args = parser.parse_args()
+
+    failures = []
+
+    def check(condition, message):
+        if not condition:
+            failures.append(message)
+
+    client = LocalEarthEngine(args.latency)
+    serial, serial_s = timed(serial_rerun, client, YEARS)
+    serial_calls = client.calls
+
+    client = LocalEarthEngine(args.latency)
+    clock = FakeClock()
+    resolver = ee_layers.LayerResolver(client, ttl=60, max_workers=len(YEARS), clock=clock)
+    cold, cold_s = timed(resolver.nlcd_urls, YEARS)
+    cold_calls = client.calls
+    _, warm_s = timed(resolver.nlcd_urls, YEARS)
+    warm_calls = client.calls - cold_calls
+    check(warm_calls == 0, f"warm rerun made {warm_calls} remote calls")
+    check(cold == serial, "resolver URLs differ from the serial ones")
+
+    # Sessions starting together on a cold cache share one round trip per year
+    resolver.clear()
+    calls_before = client.calls
+    with ThreadPoolExecutor(args.sessions) as sessions:
+        _, concurrent_s = timed(lambda: list(sessions.map(lambda _: resolver.nlcd_urls(YEARS),
+                                                          range(args.sessions))))
+    concurrent_calls = client.calls - calls_before
+    check(concurrent_calls == len(YEARS), f"{args.sessions} sessions made {concurrent_calls} remote calls")
+
+    clock.now += 61
+    calls_before = client.calls
+    _, expired_s = timed(resolver.nlcd_urls, YEARS[:2])
+    expired_calls = client.calls - calls_before
+    check(expired_calls == 2, "expired entries were not refetched")
+
+    print(f"{'rerun':<34}{'seconds':>9}{'remote calls':>14}")
+    print(f"{'serial (before)':<34}{serial_s:>9.3f}{serial_calls:>14}")
+    print(f"{'resolver, cold':<34}{cold_s:>9.3f}{cold_calls:>14}")
+    print(f"{'resolver, warm':<34}{warm_s:>9.3f}{warm_calls:>14}")
+    print(f"{f'resolver, {args.sessions} cold sessions':<34}{concurrent_s:>9.3f}{concurrent_calls:>14}")
+    print(f"{'resolver, 2 layers after TTL':<34}{expired_s:>9.3f}{expired_calls:>14}")
+    for message in failures:
+        print(f"FAIL: {message}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""Bytes per feature of the risk layer GeoJSON and the map page, before and after geojson_encoding.
+
+For each layer and simplification tier, compares the old layer (``to_json``
+of the styled layer with every Census column, drawn with folium.GeoJson)
+with ``geojson_encoding.encode`` at each ``--precision`` drawn with
+choropleth.RiskGeoJson. Reports the payload and what the layer adds to the
+rendered map page, raw and gzipped (what a deflate-compressed transfer
+costs). The fixture layers only carry the key columns, so the remaining
+cb_2020 columns are filled in with values of the real widths unless
+``--store-dir`` points at a store of the real files. Checks that the encoded
+payload keeps every feature, only the requested properties and coordinates
+within half a unit of the last decimal, and that the page carries it
+verbatim. Exits non-zero if a check fails.
+
+    python benchmarks/bench_geojson_encoding.py [--store-dir DIR] [--precision 4 5 6]
+"""
+import argparse
+import gzip
+import json
+import sys
+import tempfile
+
+import fixtures
+
+import folium
+import numpy as np
+import shapely
+from folium.features import GeoJsonTooltip
+from shapely.geometry import shape
+
+import boundary_store
+import choropleth
+import geojson_encoding
+import map_engine
+import risk_data
+import risk_layers
+import simplification
+
+# cb_2020 columns the fixtures leave out -> a value of typical width
+CENSUS_COLUMNS = {
+    'COUNTYNS': '01035617',
+    'AFFGEOID': '0500000US01001',
+    'NAMELSAD': 'Autauga County',
+    'STUSPS': 'AL',
+    'STATE_NAME': 'Alabama',
+    'LSAD': '06',
+    'ALAND': 1539631461,
+    'AWATER': 25677536,
+}
+
+
+def with_census_columns(layer):
+    missing = {column: value for column, value in CENSUS_COLUMNS.items() if column not in layer.columns}
+    return layer.assign(**missing)
+
+
+def max_coordinate_error(layer, decoded):
+    original = shapely.get_coordinates(np.asarray(layer.geometry.values))
+    encoded = shapely.get_coordinates(np.asarray([shape(f['geometry']) for f in decoded['features']]))
+    return float(np.abs(original - encoded).max())
+
+
+def page_bytes(layer=None):
+    """Rendered map page with ``layer`` (a folium layer) on it."""
+    m = map_engine.base_map()
+    if layer is not None:
+        layer.add_to(m)
+    return m.get_root().render().encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--store-dir', help='Existing boundary store (default: fresh fixture store)')
+    parser.add_argument('--precision', type=int, nargs='+', default=[4, 5, 6])
+    args = parser.parse_args()
+
+    risk_type = 'Earthquake'
+    risk_column = risk_layers.RISK_COLUMNS[risk_type]
+    properties = choropleth.feature_properties(risk_column)
+    failed = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store_dir = args.store_dir or fixtures.seed_store(tmp_dir)
+        boundary_store.STORE_DIR = store_dir
+        boundary_store.OFFLINE = True
+        provider = risk_data.SyntheticRiskProvider()
+
+        empty_page = page_bytes()
+        empty_zipped = len(gzip.compress(empty_page, compresslevel=6))
+        print(f"{'layer':<16}{'encoding':<14}{'features':>9}{'B/feature':>11}"
+              f"{'page B/feature':>16}{'gzip page B/f':>15}{'x smaller':>10}")
+        for view_type, layer_name in risk_layers.VIEW_LAYERS.items():
+            risk_table = provider.risk_scores(view_type)
+            for tier in ['full'] + list(simplification.TIERS):
+                boundaries = boundary_store.load_layer(layer_name, store_dir=store_dir, tier=tier)
+                layer = risk_layers.join_risk(with_census_columns(boundaries), risk_table)
+                styled = choropleth.style_layer(layer, risk_column)
+                n = len(styled)
+
+                fields = ['NAME', risk_column]
+                before = styled.to_json()
+                page = page_bytes(folium.GeoJson(
+                    before, style_function=lambda feature: choropleth.FEATURE_STYLES[feature['properties']['risk_class']],
+                    tooltip=GeoJsonTooltip(fields=fields, localize=True)))
+                rows = [('to_json', before.encode(), page)]
+                for precision in args.precision:
+                    payload = geojson_encoding.encode(styled, properties, precision)
+                    page = page_bytes(choropleth.RiskGeoJson(payload, fields=fields, aliases=fields))
+                    rows.append((f'encode p={precision}', payload.encode(), page))
+
+                    decoded = json.loads(payload)
+                    label = f"{layer_name}@{tier} p={precision}"
+                    if len(decoded['features']) != n:
+                        failed.append(f"{label}: {len(decoded['features'])} features for {n} rows")
+                    if set(decoded['features'][0]['properties']) != set(properties):
+                        failed.append(f"{label}: properties {sorted(decoded['features'][0]['properties'])}")
+                    error = max_coordinate_error(styled, decoded)
+                    if error > 0.5 * 10 ** -precision + 1e-12:
+                        failed.append(f"{label}: coordinate error {error:.2e}")
+                    if payload.encode() not in page:
+                        failed.append(f"{label}: payload not embedded verbatim in the page")
+
+                # What the layer adds to the page over the bare basemap
+                before_page = len(gzip.compress(rows[0][2], compresslevel=6)) - empty_zipped
+                for encoding, payload, page in rows:
+                    zipped = len(gzip.compress(page, compresslevel=6)) - empty_zipped
+                    print(f"{layer_name + '@' + tier:<16}{encoding:<14}{n:>9}{len(payload) / n:>11.0f}"
+                          f"{(len(page) - len(empty_page)) / n:>16.0f}{zipped / n:>15.0f}"
+                          f"{before_page / zipped:>10.1f}")
+
+    for message in failed:
+        print(f"FAIL: {message}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Hex grid build time, feature count and payload per resolution, against the county layer.
+
+Builds every hex grid resolution from the county layer, bins the synthetic
+county risk scores into it and compares the styled GeoJSON payload and the
+folium render time with the county layer at the matching simplification
+tier. Checks that every hexagon's score lies within the range of the county
+scores it was binned from. Exits non-zero if a check fails.
+
+    python benchmarks/bench_hex_grid.py [--store-dir DIR] [--repeat N]
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+
+import fixtures
+
+import folium
+import numpy as np
+import shapely
+
+import boundary_store
+import hex_grid
+import risk_data
+import risk_layers
+import simplification
+
+
+def render_seconds(gdf, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        m = folium.Map(location=[37.0902, -95.7129], zoom_start=4, tiles="cartodbpositron", prefer_canvas=True)
+        folium.GeoJson(gdf.__geo_interface__).add_to(m)
+        m.get_root().render()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def describe(label, gdf, repeat):
+    vertices = int(shapely.get_num_coordinates(gdf.geometry.values).sum())
+    payload = len(json.dumps(gdf.__geo_interface__).encode())
+    seconds = render_seconds(gdf, repeat)
+    print(f"{label:<22}{len(gdf):>9}{vertices:>10}{payload / 1024:>12.0f}{seconds:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--store-dir', help='Existing boundary store (default: fresh fixture store)')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    failed = []
+    columns = list(risk_layers.RISK_COLUMNS.values())
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store_dir = args.store_dir or fixtures.seed_store(tmp_dir)
+        boundary_store.STORE_DIR = store_dir
+        boundary_store.OFFLINE = True
+        county_table = risk_data.SyntheticRiskProvider().risk_scores('County')
+
+        print(f"{'layer':<22}{'features':>9}{'vertices':>10}{'payload KB':>12}{'render s':>10}")
+        for resolution in hex_grid.RESOLUTIONS:
+            start = time.perf_counter()
+            hexes = hex_grid.build_hex_layer(resolution, store_dir=store_dir)
+            build_s = time.perf_counter() - start
+            table = hex_grid.hex_risk_table(hexes, county_table, columns)
+            layer = hexes[['GEOID', 'NAME', 'geometry']].assign(**{c: table[c].to_numpy() for c in columns})
+
+            tier = simplification.tier_for_zoom(resolution)
+            describe(f"county@{tier}", boundary_store.load_layer('county', store_dir=store_dir, tier=tier), args.repeat)
+            describe(f"{hex_grid.layer_name(resolution)} ({build_s:.1f}s build)", layer, args.repeat)
+
+            samples = hexes[hex_grid.SAMPLE_COLUMNS].to_numpy()
+            scores = county_table.set_index('geoid_key')
+            for column in columns:
+                values = scores[column].reindex(samples.ravel()).to_numpy(dtype=float).reshape(samples.shape)
+                low, high = np.nanmin(values, axis=1), np.nanmax(values, axis=1)
+                binned = table[column].to_numpy()
+                outside = ~((binned >= low - 1e-9) & (binned <= high + 1e-9))
+                if outside.any():
+                    failed.append(f"{hex_grid.layer_name(resolution)}: {outside.sum()} hexagons outside "
+                                  f"their county {column} range")
+
+    for message in failed:
+        print(f"FAIL: {message}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Latency and peak RSS of loading the map layers, eager (both) vs lazy (selected only).
+
+Each measurement runs in a fresh interpreter; the peak is taken over the
+load alone, after the imports (see peak_memory.py), and reported with how
+far it rose above the RSS before the load.
+
+    python benchmarks/bench_layers.py [--store-dir DIR] [--repeat N]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import fixtures
+import peak_memory
+
+import risk_layers
+
+
+def eager_load(view_type):
+    # The pre-lazy behaviour: both layers loaded and merged, one thrown away
+    layers = {view: risk_layers.load_risk_layer(view) for view in risk_layers.VIEW_LAYERS}
+    return layers[view_type]
+
+
+def lazy_load(view_type):
+    return risk_layers.load_risk_layer(view_type)
+
+
+def _child(mode, view_type):
+    loader = eager_load if mode == 'eager' else lazy_load
+    peak_memory.reset_peak()
+    before = peak_memory.current_mb()
+    start = time.perf_counter()
+    layer = loader(view_type)
+    elapsed = time.perf_counter() - start
+    peak = peak_memory.peak_mb()
+    print(json.dumps({'seconds': elapsed, 'peak_rss_mb': peak, 'load_mb': peak - before, 'rows': len(layer)}))
+
+
+def _run(store_dir, mode, view_type):
+    env = dict(os.environ, BOUNDARY_STORE_DIR=store_dir, BOUNDARY_STORE_OFFLINE='1')
+    out = subprocess.run(
+        [sys.executable, __file__, '--child', mode, view_type],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--store-dir', help='Existing boundary store (default: fresh fixture store)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store_dir = args.store_dir or fixtures.seed_store(tmp_dir)
+        print(f"{'view':<8}{'mode':<7}{'rows':>6}{'seconds':>10}{'peak MB':>10}{'load MB':>10}")
+        for view_type in risk_layers.VIEW_LAYERS:
+            results = {}
+            for mode in ('eager', 'lazy'):
+                runs = [_run(store_dir, mode, view_type) for _ in range(args.repeat)]
+                best = min(runs, key=lambda r: r['seconds'])
+                results[mode] = best
+                print(f"{view_type:<8}{mode:<7}{best['rows']:>6}"
+                      f"{best['seconds']:>10.3f}{best['peak_rss_mb']:>10.1f}{best['load_mb']:>10.1f}")
+            saved_s = results['eager']['seconds'] - results['lazy']['seconds']
+            saved_mb = results['eager']['peak_rss_mb'] - results['lazy']['peak_rss_mb']
+            saved_load = results['eager']['load_mb'] - results['lazy']['load_mb']
+            print(f"{view_type:<8}saved  {saved_s:>16.3f}{saved_mb:>10.1f}{saved_load:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Scaling of the policy point spatial join and aggregation, 10k to 10M points.
+
+Generates uniform synthetic policy points over the fixture counties and
+times ``point_aggregation.assign_counties`` in-process and on a process
+pool, then ``geography_stats`` for both view types. Checks that the pool
+assigns exactly the same counties as the in-process join and that every
+point inside the coverage is assigned. Exits non-zero if a check fails.
+The pool is only used once there is more than one ``--chunk-size`` chunk.
+
+    python benchmarks/bench_point_aggregation.py --sizes 10000 1000000 10000000 --workers 0 4
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import fixtures
+
+import point_aggregation
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--store-dir', help='Existing boundary store (default: fresh fixture store)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000, 10_000_000])
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, os.cpu_count() or 1])
+    parser.add_argument('--chunk-size', type=int, default=point_aggregation.CHUNK_POINTS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store_dir = args.store_dir or fixtures.seed_store(os.path.join(tmp_dir, 'boundaries'))
+        fixtures.boundary_store.STORE_DIR = store_dir
+        fixtures.boundary_store.OFFLINE = True
+        bounds = fixtures.boundary_store.load_layer('county', columns=['geometry']).total_bounds
+        # Shrunk a little so every point falls inside the fixture coverage
+        west, south, east, north = bounds + np.array([0.1, 0.1, -0.1, -0.1])
+
+        failed = []
+        print(f"{'points':>12}{'workers':>9}{'join s':>9}{'Mpts/s':>9}{'stats s':>9}{'RSS MB':>9}")
+        for n in args.sizes:
+            points = point_aggregation.synthetic_points(n, years=[2023], bounds=(west, south, east, north))
+            reference = None
+            for workers in args.workers:
+                start = time.perf_counter()
+                keys = point_aggregation.assign_counties(points['lon'], points['lat'], workers, args.chunk_size)
+                join_s = time.perf_counter() - start
+
+                start = time.perf_counter()
+                joined = points.drop(columns=['lon', 'lat']).assign(county_key=keys, state_key=keys // 1000)
+                for view_type in ('State', 'County'):
+                    point_aggregation.geography_stats(joined[keys >= 0], view_type)
+                stats_s = time.perf_counter() - start
+
+                # ru_maxrss is in KB on Linux
+                rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+                print(f"{n:>12,}{workers:>9}{join_s:>9.2f}{n / join_s / 1e6:>9.2f}{stats_s:>9.2f}{rss:>9.0f}")
+
+                if (keys < 0).any():
+                    failed.append(f"{n:,} points, {workers} workers: {(keys < 0).sum()} points not assigned")
+                if reference is None:
+                    reference = keys
+                elif not np.array_equal(reference, keys):
+                    failed.append(f"{n:,} points, {workers} workers: assignment differs from in-process")
+
+    for message in failed:
+        print(f"FAIL: {message}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Build time and query latency of the click / viewport spatial index.
+
+Times ``spatial_index.layer_index`` for both view types on the fixture store,
+then random click points and viewports at zoom 4-8 sized boxes over the
+continental US. Exits non-zero if the p95 of either query exceeds
+``--max-query-ms`` (1 ms by default).
+
+    python benchmarks/bench_spatial_index.py [--store-dir DIR] [--queries N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import fixtures
+
+import spatial_index
+
+# Continental US, where the clicks land
+WEST, SOUTH, EAST, NORTH = -125.0, 24.0, -66.0, 50.0
+
+
+def time_queries(query, args_list):
+    latencies = []
+    for args in args_list:
+        start = time.perf_counter()
+        query(*args)
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--store-dir', help='Existing boundary store (default: fresh fixture store)')
+    parser.add_argument('--queries', type=int, default=10_000)
+    parser.add_argument('--max-query-ms', type=float, default=1.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store_dir = args.store_dir or fixtures.seed_store(os.path.join(tmp_dir, 'boundaries'))
+        fixtures.boundary_store.STORE_DIR = store_dir
+        fixtures.boundary_store.OFFLINE = True
+
+        rng = np.random.RandomState(0)
+        points = list(zip(rng.uniform(WEST, EAST, args.queries), rng.uniform(SOUTH, NORTH, args.queries)))
+        # Viewport spans of a 700px map at zoom 4 to 8
+        spans = 700 * 360 / (256 * 2.0 ** rng.randint(4, 9, args.queries))
+        boxes = [(lon - span / 2, lat - span / 4, lon + span / 2, lat + span / 4)
+                 for (lon, lat), span in zip(points, spans)]
+
+        failed = False
+        print(f"{'view':<8}{'features':>9}{'build ms':>10}{'query':>8}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}")
+        for view_type in ('State', 'County'):
+            start = time.perf_counter()
+            index = spatial_index.layer_index(view_type)
+            build_ms = (time.perf_counter() - start) * 1000
+            for name, query, query_args in (('point', index.at_point, points),
+                                            ('bbox', index.in_bounds, boxes)):
+                ms = time_queries(query, query_args)
+                p95 = np.percentile(ms, 95)
+                line = (f"{view_type:<8}{len(index):>9}{build_ms:>10.1f}{name:>8}"
+                        f"{np.percentile(ms, 50):>9.3f}{p95:>9.3f}{ms.max():>9.3f}")
+                if p95 > args.max_query_ms:
+                    failed = True
+                    line += '  SLOW'
+                print(line)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
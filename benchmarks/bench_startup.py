@@ -0,0 +1,168 @@
+"""Cold-start benchmark: import cost, wall time and RSS of each page on its own.
+
+Every page runs once in a fresh interpreter under ``python -X importtime``
+and AppTest, against the offline fixture store. The imports made by the
+page itself (after streamlit and AppTest are loaded) are parsed from the
+importtime report, so a heavy dependency leaking into a page that does not
+need it shows up as import time and in the top-imports column.
+
+    python benchmarks/bench_startup.py --save startup.json
+    python benchmarks/bench_startup.py --baseline startup.json --max-regression 0.25
+
+RSS is the peak of the page's own process and +RSS how far the page run
+raised it over streamlit and AppTest alone (see peak_memory.py). With
+--baseline the run exits non-zero if the cold start, import time, RSS or
++RSS of any page grows past the threshold. pages/basemap.py and
+pages/nlcd_demo.py need Earth Engine credentials and are not covered.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+METRICS = ('cold_start_s', 'import_ms', 'rss_mb', 'rss_delta_mb')
+SENTINEL = 'bench_startup: page start'
+
+# Page -> AppTest script
+PAGES = {
+    'app_pages.dashboard': 'import app_pages\napp_pages.dashboard()',
+    'app_pages.maps': 'import app_pages\napp_pages.maps()',
+    'app_pages.customer_sales_trend': 'import app_pages\napp_pages.customer_sales_trend()',
+    'dashboard.render_dashboard': 'import dashboard\ndashboard.render_dashboard()',
+    'app': open(os.path.join(REPO_ROOT, 'app.py')).read(),
+}
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def child(page):
+    """Run ``page`` once and print its rerun time and RSS as JSON (runs in the subprocess)."""
+    from streamlit.testing.v1 import AppTest
+
+    import peak_memory
+
+    sys.path.insert(0, REPO_ROOT)
+    peak_memory.reset_peak()
+    rss_before = peak_memory.current_mb()
+    modules_before = len(sys.modules)
+    sys.stderr.write(SENTINEL + '\n')
+    sys.stderr.flush()
+
+    start = time.perf_counter()
+    at = AppTest.from_string(PAGES[page], default_timeout=120)
+    at.run()
+    seconds = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"{page} raised: {at.exception[0].value}")
+
+    # Peak of this process since the page started, not ru_maxrss (see peak_memory.py)
+    rss = peak_memory.peak_mb()
+    print(json.dumps({
+        'run_s': seconds,
+        'rss_mb': rss,
+        'rss_delta_mb': rss - rss_before,
+        'modules': len(sys.modules) - modules_before,
+    }))
+
+
+def parse_importtime(stderr, top=5):
+    """Total self time (ms) of the imports after the sentinel and the slowest top-level ones."""
+    lines = stderr.split(SENTINEL, 1)[-1].splitlines()
+    total_us = 0
+    top_level = []
+    for line in lines:
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        total_us += int(self_us)
+        if len(indent) == 1:
+            top_level.append((int(cumulative_us), name))
+    top_level.sort(reverse=True)
+    return total_us / 1000, [f"{name} {us / 1000:.0f}ms" for us, name in top_level[:top]]
+
+
+def measure(page, env):
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', __file__, '--child', page],
+        env=env, capture_output=True, text=True, cwd=REPO_ROOT)
+    cold_start = time.perf_counter() - start
+    if proc.returncode:
+        raise RuntimeError(f"{page} failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    import_ms, top_imports = parse_importtime(proc.stderr)
+    return dict(result, cold_start_s=cold_start, import_ms=import_ms, top_imports=top_imports)
+
+
+def run(repeat):
+    import fixtures
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store_dir = fixtures.seed_store(os.path.join(tmp_dir, 'boundaries'))
+        env = dict(
+            os.environ,
+            BOUNDARY_STORE_DIR=store_dir,
+            BOUNDARY_STORE_OFFLINE='1',
+            RENDER_CACHE_DIR=os.path.join(tmp_dir, 'render_cache'),
+            VECTOR_TILE_DIR=os.path.join(tmp_dir, 'tiles'),
+        )
+        for page in PAGES:
+            runs = [measure(page, env) for _ in range(repeat)]
+            # Medians over the runs, the import breakdown of the first one
+            results[page] = dict(runs[0], **{
+                metric: statistics.median(r[metric] for r in runs)
+                for metric in ('cold_start_s', 'import_ms', 'rss_mb', 'rss_delta_mb', 'run_s')})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against results saved with --save')
+    parser.add_argument('--max-regression', type=float, default=0.25)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return 0
+
+    results = run(args.repeat)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    failed = []
+    print(f"{'page':<34}{'cold s':>8}{'import ms':>11}{'RSS MB':>8}{'+RSS MB':>9}{'modules':>9}  top imports")
+    for page, m in results.items():
+        line = (f"{page:<34}{m['cold_start_s']:>8.2f}{m['import_ms']:>11.0f}{m['rss_mb']:>8.0f}"
+                f"{m['rss_delta_mb']:>9.0f}{m['modules']:>9}  {', '.join(m['top_imports'])}")
+        regressed = [metric for metric in METRICS if page in baseline and baseline[page][metric] > 0
+                     and m[metric] / baseline[page][metric] - 1 > args.max_regression]
+        if regressed:
+            failed.append(page)
+            line += '  REGRESSION: ' + ', '.join(regressed)
+        print(line)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if failed:
+        print(f"{len(failed)} page(s) regressed more than {args.max_regression:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Per-feature Python style lambdas vs vectorized precomputed styling on the county layer.
+
+Times building the layer and rendering the map HTML. The lambdas run once
+per feature inside folium.GeoJson's render; the precomputed path is the one
+the maps use, ``choropleth.add_risk_layer``: risk classes in one vectorized
+pass, the compact payload embedded by RiskGeoJson and styled in the browser.
+
+    python benchmarks/bench_styling.py [--store-dir DIR] [--repeat N]
+"""
+import argparse
+import tempfile
+import time
+
+import fixtures
+
+import folium
+
+import boundary_store
+import choropleth
+import risk_layers
+
+RISK_COLUMN = 'Earthquake_Risk_Score'
+
+
+def lambda_red_green(m, layer_risk):
+    # The original tooltip-layer style
+    folium.GeoJson(layer_risk.__geo_interface__, style_function=lambda feature: {
+        'fillColor': 'red' if feature['properties'][RISK_COLUMN] > 5 else 'green',
+        'color': 'black',
+        'weight': 0.5,
+        'fillOpacity': 0.6,
+    }).add_to(m)
+
+
+def lambda_classed(m, layer_risk):
+    # Threshold classing done per feature in Python
+    folium.GeoJson(layer_risk.__geo_interface__, style_function=lambda feature: {
+        'fillColor': risk_layers.risk_colors([feature['properties'][RISK_COLUMN]])[0],
+        'color': 'black',
+        'weight': 0.5,
+        'fillOpacity': 0.7,
+    }).add_to(m)
+
+
+def precomputed(m, layer_risk):
+    choropleth.add_risk_layer(m, layer_risk, 'County', 'Earthquake')
+
+
+def best_seconds(build, layer_risk, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        m = folium.Map(location=[37.0902, -95.7129], zoom_start=4, tiles="cartodbpositron")
+        build(m, layer_risk)
+        m.get_root().render()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--store-dir', help='Existing boundary store (default: fresh fixture store)')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        boundary_store.STORE_DIR = args.store_dir or fixtures.seed_store(tmp_dir)
+        layer_risk = risk_layers.load_risk_layer('County', zoom=4)
+        print(f"county layer: {len(layer_risk)} features")
+        for build in (lambda_red_green, lambda_classed, precomputed):
+            print(f"{build.__name__:<18}{best_seconds(build, layer_risk, args.repeat):>8.3f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""GeoJSON payload size and folium render time for each simplification tier.
+
+    python benchmarks/bench_tiers.py [--store-dir DIR] [--repeat N]
+"""
+import argparse
+import json
+import tempfile
+import time
+
+import fixtures
+
+import folium
+import shapely
+
+import boundary_store
+import simplification
+
+
+def render_seconds(gdf, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        m = folium.Map(location=[37.0902, -95.7129], zoom_start=4, tiles="cartodbpositron")
+        folium.GeoJson(gdf.__geo_interface__).add_to(m)
+        m.get_root().render()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--store-dir', help='Existing boundary store (default: fresh fixture store)')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store_dir = args.store_dir or fixtures.seed_store(tmp_dir)
+        print(f"{'layer':<8}{'tier':<8}{'vertices':>10}{'payload KB':>12}{'render s':>10}")
+        for layer in boundary_store.LAYER_SOURCES:
+            for tier in ['full'] + list(simplification.TIERS):
+                gdf = boundary_store.load_layer(layer, store_dir=store_dir, tier=tier)
+                vertices = int(shapely.get_num_coordinates(gdf.geometry.values).sum())
+                payload = len(json.dumps(gdf.__geo_interface__).encode())
+                seconds = render_seconds(gdf, args.repeat)
+                print(f"{layer:<8}{tier:<8}{vertices:>10}{payload / 1024:>12.0f}{seconds:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Timings of the time-series downsampling in timeseries.py.
+
+For series of 1k to 10M points (random walks with spikes, NaN gaps and a
+datetime index) and frames of one to three columns, reports how many points
+each method keeps and how long it takes. The point-count, end point and
+extrema checks live in tests/test_timeseries.py.
+
+    python benchmarks/bench_timeseries.py --sizes 1000 100000 10000000 --width 800
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Not through fixtures, which needs geopandas
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import timeseries  # noqa: E402
+
+
+def make_series(n, columns, seed=0):
+    rng = np.random.RandomState(seed)
+    values = rng.randn(n, columns).cumsum(axis=0)
+    # A few isolated spikes the downsampling must not drop, and a NaN gap
+    spikes = rng.randint(0, n, size=(5, columns))
+    for column in range(columns):
+        values[spikes[:, column], column] += 1000 * (column + 1)
+    values[n // 3:n // 3 + min(100, n // 10), 0] = np.nan
+    index = pd.date_range('2020-01-01', periods=n, freq='s')
+    return pd.DataFrame(values, index=index, columns=[f"s{c}" for c in range(columns)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000, 1_000_000, 10_000_000])
+    parser.add_argument('--width', type=int, default=timeseries.DEFAULT_WIDTH)
+    args = parser.parse_args()
+
+    max_points = 2 * args.width
+    print(f"{'points':>12}{'cols':>6}{'method':>8}{'kept':>8}{'ms':>10}")
+    for n in args.sizes:
+        for columns in (1, 3):
+            frame = make_series(n, columns)
+            for method in ('minmax', 'lttb'):
+                start = time.perf_counter()
+                reduced = timeseries.downsample(frame, max_points, method)
+                elapsed = time.perf_counter() - start
+                print(f"{n:>12,}{columns:>6}{method:>8}{len(reduced):>8}{elapsed * 1000:>10.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Synthetic Census-like boundary fixtures so benchmarks run fully offline.
+
+States and counties are laid out as a regular grid over the continental US
+extent with the same key columns as the cb_2020 shapefiles (STATEFP,
+COUNTYFP, GEOID, NAME). County names repeat across states, like the real
+"Washington" counties do. Edges are densified and wiggled so the polygons
+have realistic vertex counts for simplification and payload benchmarks;
+shared edges get identical vertices, as in a real coverage.
+"""
+import os
+import sys
+import tempfile
+import zipfile
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from shapely.geometry import box
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import boundary_store  # noqa: E402
+
+# Continental US bounding box
+MIN_X, MIN_Y, MAX_X, MAX_Y = -124.8, 24.5, -66.9, 49.4
+
+STATE_GRID = (13, 4)          # 52 states
+COUNTIES_PER_STATE = (8, 8)   # 3,328 counties
+COUNTY_NAME_POOL = 1900       # fewer names than counties, so names repeat
+
+SEGMENT_LENGTH = 0.005        # degrees between densified vertices
+WIGGLE = 0.02                 # amplitude of the edge wiggle in degrees
+
+
+def _grid(min_x, min_y, max_x, max_y, nx, ny):
+    # Corners computed from indices so neighbours share exactly the same edges
+    xs = np.linspace(min_x, max_x, nx + 1)
+    ys = np.linspace(min_y, max_y, ny + 1)
+    for j in range(ny):
+        for i in range(nx):
+            yield box(xs[i], ys[j], xs[i + 1], ys[j + 1])
+
+
+def _wiggle(geom):
+    dense = shapely.segmentize(geom, SEGMENT_LENGTH)
+
+    def offset(coords):
+        x, y = coords[:, 0], coords[:, 1]
+        return np.column_stack([x + WIGGLE * np.sin(7.0 * y) * np.cos(3.0 * x),
+                                y + WIGGLE * np.sin(5.0 * x) * np.cos(2.0 * y)])
+    return shapely.transform(dense, offset)
+
+
+def make_layers():
+    """Return ``(states, counties)`` GeoDataFrames in EPSG:4269 like the Census files."""
+    states = []
+    counties = []
+    for s, state_geom in enumerate(_grid(MIN_X, MIN_Y, MAX_X, MAX_Y, *STATE_GRID)):
+        statefp = f"{s + 1:02d}"
+        states.append({'STATEFP': statefp, 'GEOID': statefp, 'STUSPS': f"S{statefp}",
+                       'NAME': f"State {statefp}", 'geometry': _wiggle(state_geom)})
+        for c, county_geom in enumerate(_grid(*state_geom.bounds, *COUNTIES_PER_STATE)):
+            countyfp = f"{2 * c + 1:03d}"
+            name_id = (s * 64 + c) % COUNTY_NAME_POOL
+            counties.append({'STATEFP': statefp, 'COUNTYFP': countyfp,
+                             'GEOID': statefp + countyfp, 'NAME': f"County {name_id}",
+                             'geometry': _wiggle(county_geom)})
+    return (gpd.GeoDataFrame(states, crs='EPSG:4269'),
+            gpd.GeoDataFrame(counties, crs='EPSG:4269'))
+
+
+def write_zip(gdf, zip_path):
+    """Write ``gdf`` as a zipped shapefile, like the files the Census publishes."""
+    stem = os.path.splitext(os.path.basename(zip_path))[0]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        gdf.to_file(os.path.join(tmp_dir, stem + '.shp'))
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for name in sorted(os.listdir(tmp_dir)):
+                zf.write(os.path.join(tmp_dir, name), name)
+    return zip_path
+
+
+def seed_store(store_dir):
+    """Write fixture zips into ``store_dir`` and import them into a boundary store there."""
+    os.makedirs(store_dir, exist_ok=True)
+    states, counties = make_layers()
+    sources = {
+        'state': write_zip(states, os.path.join(store_dir, 'cb_fixture_state.zip')),
+        'county': write_zip(counties, os.path.join(store_dir, 'cb_fixture_county.zip')),
+    }
+    for layer, source in sources.items():
+        boundary_store.import_layer(layer, source=source, store_dir=store_dir)
+    return store_dir
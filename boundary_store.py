@@ -0,0 +1,215 @@
+"""Local on-disk store for the Census boundary layers used by the risk maps.
+
+Each layer is fetched (or imported from a local zip) once, written as an
+uncompressed Feather file and recorded in ``manifest.json``. Later loads
+memory-map the Feather file instead of downloading and parsing the shapefile.
+
+Pre-seed an offline node with:
+
+    python boundary_store.py seed --state cb_2020_us_state_20m.zip --county cb_2020_us_county_20m.zip
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+from lazy_imports import lazy_import
+
+# Only needed to import and load geometry, attribute reads go through pyarrow
+gpd = lazy_import('geopandas')
+
+# Census cartographic boundary files the maps are built from
+LAYER_SOURCES = {
+    'state': 'https://www2.census.gov/geo/tiger/GENZ2020/shp/cb_2020_us_state_20m.zip',
+    'county': 'https://www2.census.gov/geo/tiger/GENZ2020/shp/cb_2020_us_county_20m.zip',
+}
+
+# Bump when the on-disk layout changes so stale stores get rebuilt
+STORE_FORMAT_VERSION = 1
+
+STORE_DIR = os.environ.get(
+    'BOUNDARY_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'boundaries'),
+)
+
+# Set BOUNDARY_STORE_OFFLINE=1 on air-gapped nodes to forbid any download
+OFFLINE = os.environ.get('BOUNDARY_STORE_OFFLINE', '0') == '1'
+
+MANIFEST_NAME = 'manifest.json'
+
+
+class BoundaryStoreError(RuntimeError):
+    pass
+
+
+def _manifest_path(store_dir):
+    return os.path.join(store_dir, MANIFEST_NAME)
+
+
+def read_manifest(store_dir=None):
+    store_dir = store_dir or STORE_DIR
+    path = _manifest_path(store_dir)
+    if not os.path.exists(path):
+        return {'format_version': STORE_FORMAT_VERSION, 'layers': {}}
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != STORE_FORMAT_VERSION:
+        # Layout changed, treat every layer as missing
+        return {'format_version': STORE_FORMAT_VERSION, 'layers': {}}
+    return manifest
+
+
+def _write_manifest(manifest, store_dir):
+    os.makedirs(store_dir, exist_ok=True)
+    tmp_path = _manifest_path(store_dir) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, _manifest_path(store_dir))
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def import_layer(layer, source=None, store_dir=None):
+    """Read ``layer`` from ``source`` (a local zip or URL) and store it as Feather."""
+    if layer not in LAYER_SOURCES:
+        raise BoundaryStoreError(f"Unknown boundary layer: {layer!r}")
+    store_dir = store_dir or STORE_DIR
+    source = source or LAYER_SOURCES[layer]
+    is_local = os.path.exists(source)
+    if not is_local and OFFLINE:
+        raise BoundaryStoreError(
+            f"Boundary layer {layer!r} is not in the store at {store_dir} and "
+            f"downloads are disabled; seed it with 'python boundary_store.py seed'"
+        )
+
+    gdf = gpd.read_file(source)
+    write_layer(gdf, layer, store_dir, {
+        'source': os.path.basename(source) if is_local else source,
+        'source_sha256': _file_sha256(source) if is_local else None,
+    })
+    return gdf
+
+
+def write_layer(gdf, name, store_dir=None, meta=None):
+    """Write ``gdf`` to the store under ``name`` and record it in the manifest."""
+    store_dir = store_dir or STORE_DIR
+    os.makedirs(store_dir, exist_ok=True)
+    file_name = f"{name}.feather"
+    tmp_path = os.path.join(store_dir, file_name + '.tmp')
+    # Uncompressed Arrow IPC so later loads can memory-map the file
+    gdf.to_feather(tmp_path, compression='uncompressed')
+    os.replace(tmp_path, os.path.join(store_dir, file_name))
+
+    manifest = read_manifest(store_dir)
+    manifest['layers'][name] = dict(meta or {}, **{
+        'file': file_name,
+        'rows': len(gdf),
+        'crs': gdf.crs.to_string() if gdf.crs is not None else None,
+        'imported_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    })
+    _write_manifest(manifest, store_dir)
+
+
+def has_layer(name, store_dir=None):
+    store_dir = store_dir or STORE_DIR
+    entry = read_manifest(store_dir)['layers'].get(name)
+    return entry is not None and os.path.exists(os.path.join(store_dir, entry['file']))
+
+
+def load_layer(layer, store_dir=None, columns=None, tier=None):
+    """Return ``layer`` as a GeoDataFrame, importing it on first use.
+
+    ``tier`` selects a precomputed simplification level (see simplification.py),
+    which is built from the full-resolution layer the first time it is asked for.
+    """
+    store_dir = store_dir or STORE_DIR
+    if tier is not None and tier != 'full':
+        import simplification
+        name = simplification.tier_layer_name(layer, tier)
+        if not simplification.tier_is_current(layer, tier, store_dir=store_dir):
+            simplification.build_tier(layer, tier, store_dir=store_dir)
+        return gpd.read_feather(os.path.join(store_dir, f"{name}.feather"),
+                                columns=columns, memory_map=True)
+
+    if not has_layer(layer, store_dir):
+        gdf = import_layer(layer, store_dir=store_dir)
+        return gdf[columns] if columns else gdf
+    entry = read_manifest(store_dir)['layers'][layer]
+    return gpd.read_feather(os.path.join(store_dir, entry['file']), columns=columns, memory_map=True)
+
+
+def load_attributes(layer, columns, store_dir=None):
+    """Non-geometry ``columns`` of ``layer`` as a DataFrame, without reading any geometry."""
+    from pyarrow import feather
+
+    store_dir = store_dir or STORE_DIR
+    if not has_layer(layer, store_dir):
+        import_layer(layer, store_dir=store_dir)
+    entry = read_manifest(store_dir)['layers'][layer]
+    table = feather.read_table(os.path.join(store_dir, entry['file']), columns=columns, memory_map=True)
+    return table.to_pandas()
+
+
+def data_version(store_dir=None):
+    """Short hash of the base layers in the manifest, changes whenever one is re-imported.
+
+    Derived layers such as simplification tiers are left out so building them
+    does not invalidate anything keyed on the version.
+    """
+    layers = read_manifest(store_dir)['layers']
+    base = {name: layers[name] for name in sorted(LAYER_SOURCES) if name in layers}
+    payload = json.dumps(base, sort_keys=True).encode()
+    return hashlib.sha256(payload).hexdigest()[:12]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--store-dir', default=None, help='Store directory (default: %(default)s)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    seed = subparsers.add_parser('seed', help='Import layers from local zip files or their Census URLs')
+    for layer in LAYER_SOURCES:
+        seed.add_argument(f'--{layer}', metavar='ZIP', help=f'Local zip for the {layer} layer')
+    seed.add_argument('--download', action='store_true',
+                      help='Download any layer not given as a local zip')
+    seed.add_argument('--no-tiers', action='store_true',
+                      help='Skip precomputing the simplification tiers and hex grids')
+
+    subparsers.add_parser('list', help='Show the store manifest')
+
+    args = parser.parse_args(argv)
+    store_dir = args.store_dir or STORE_DIR
+
+    if args.command == 'seed':
+        for layer in LAYER_SOURCES:
+            source = getattr(args, layer)
+            if source is None and not args.download:
+                continue
+            gdf = import_layer(layer, source=source, store_dir=store_dir)
+            print(f"{layer}: {len(gdf)} rows -> {store_dir}")
+            if not args.no_tiers:
+                import simplification
+                for tier in simplification.TIERS:
+                    simplification.build_tier(layer, tier, store_dir=store_dir)
+                print(f"{layer}: tiers {', '.join(simplification.TIERS)}")
+            if layer == 'county' and not args.no_tiers:
+                import hex_grid
+                for resolution in hex_grid.RESOLUTIONS:
+                    hexes = hex_grid.build_hex_layer(resolution, store_dir=store_dir)
+                    print(f"{hex_grid.layer_name(resolution)}: {len(hexes)} hexagons")
+    elif args.command == 'list':
+        json.dump(read_manifest(store_dir), sys.stdout, indent=2, sort_keys=True)
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Trend charts for the Streamlit pages without per-rerun matplotlib figures.
+
+Two backends, picked with ``CHART_BACKEND``:
+
+    altair  (default) a Vega-Lite spec rendered in the browser; the server
+            only sends the (downsampled) data points
+    png     a matplotlib PNG, rendered once per distinct input and served
+            from the shared resource cache afterwards; the Figure is built
+            outside pyplot and cleared after rendering, so the long-lived
+            server process never accumulates figures
+
+    charts.line_chart(frame, x='Year', y='Customers', title='Customer Sales Trend')
+
+benchmarks/bench_chart_soak.py reruns the page thousands of times and
+checks that memory stays flat with both backends.
+"""
+import hashlib
+import io
+import os
+
+import pandas as pd
+
+import resource_cache
+import timeseries
+
+BACKEND = os.environ.get('CHART_BACKEND', 'altair')
+
+# PNG size in inches at PNG_DPI
+PNG_SIZE = (8, 4)
+PNG_DPI = 100
+
+
+def data_key(frame, *params):
+    """Hash of the frame contents and the chart parameters."""
+    digest = hashlib.sha256(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    digest.update(repr(params).encode())
+    return digest.hexdigest()
+
+
+def render_png(frame, x, y, title):
+    """PNG bytes of a line plot of ``y`` against ``x``; the figure is released before returning."""
+    from matplotlib.figure import Figure
+
+    # Not pyplot: a bare Figure is never registered with the global figure manager
+    fig = Figure(figsize=PNG_SIZE, dpi=PNG_DPI)
+    try:
+        ax = fig.subplots()
+        timeseries.plot_line(ax, frame[x].to_numpy(), frame[y].to_numpy(), marker='o')
+        ax.set_xlabel(x)
+        ax.set_ylabel(y)
+        ax.set_title(title)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png')
+        return buffer.getvalue()
+    finally:
+        fig.clear()
+
+
+def png_chart(frame, x, y, title):
+    """Cached PNG bytes of the chart, rendered only for data not seen before."""
+    key = ('chart_png', data_key(frame, x, y, title, PNG_SIZE, PNG_DPI))
+    return resource_cache.shared_cache().get_or_load(key, lambda: render_png(frame, x, y, title))
+
+
+def altair_chart(frame, x, y, title, width=None):
+    import altair as alt
+
+    data = timeseries.downsample(frame.set_index(x)[[y]], 2 * (width or timeseries.DEFAULT_WIDTH))
+    return alt.Chart(data.reset_index(), title=title).mark_line(point=True).encode(
+        x=alt.X(f'{x}:O'), y=alt.Y(f'{y}:Q'))
+
+
+def line_chart(frame, x, y, title, backend=None):
+    """Display a line chart of ``y`` against ``x`` in the current Streamlit app."""
+    import streamlit as st
+
+    backend = backend or BACKEND
+    if backend == 'altair':
+        return st.altair_chart(altair_chart(frame, x, y, title), use_container_width=True)
+    if backend == 'png':
+        return st.image(png_chart(frame, x, y, title))
+    raise ValueError(f"Unknown chart backend: {backend!r}")
@@ -0,0 +1,127 @@
+"""Single-layer risk choropleth.
+
+Fill colour, threshold classing and tooltip all hang off one GeoJSON layer,
+so each feature's geometry is serialized into the page exactly once
+(folium.Choropleth plus a separate tooltip GeoJson used to embed it twice).
+
+Classes and colours are computed for the whole layer in one vectorized pass
+and stored as feature properties; the browser then styles each feature by a
+constant lookup of one of a handful of prebuilt style dicts. The layer
+embeds the compact payload of geojson_encoding.py as is.
+"""
+import folium
+from branca.colormap import StepColormap
+from jinja2 import Template
+
+import geojson_encoding
+import risk_layers
+import vector_tiles
+
+# Prebuilt style per risk class, -1 is for missing scores
+FEATURE_STYLES = {
+    risk_class: {'fillColor': color, 'color': 'black', 'weight': 0.5, 'fillOpacity': 0.7}
+    for risk_class, color in enumerate(risk_layers.RISK_PALETTE)
+}
+FEATURE_STYLES[-1] = dict(FEATURE_STYLES[0], fillColor=risk_layers.NAN_COLOR)
+
+
+class RiskGeoJson(folium.map.Layer):
+    """GeoJSON layer embedding an encoded payload string as is, styled by risk class in the browser.
+
+    folium.GeoJson would parse the payload and write it back out, and run the
+    style function once per feature in Python; here the cached string goes
+    into the page untouched and the style is looked up from ``FEATURE_STYLES``
+    on the client. ``var_name`` fixes the JavaScript variable, so scripts sent
+    later (incremental_map.RiskRestyle) can find the layer whatever ids
+    folium or streamlit-folium hand out.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = L.geoJson({{ this.payload }}, {
+            style: function(feature) {
+                // Features without a class yet (the incremental map's geometry) start out grey
+                var styles = {{ this.styles|tojson }};
+                return styles[feature.properties.risk_class] || styles[-1];
+            },
+            onEachFeature: function(feature, layer) {
+                var fields = {{ this.fields|tojson }};
+                var aliases = {{ this.aliases|tojson }};
+                layer.bindTooltip(function(layer) {
+                    var properties = layer.feature.properties;
+                    return '<table>' + fields.map(function(field, i) {
+                        var value = properties[field];
+                        if (typeof value === 'number') { value = value.toLocaleString(); }
+                        return '<tr><th>' + aliases[i] + '</th><td>' + (value == null ? '' : value) + '</td></tr>';
+                    }).join('') + '</table>';
+                }, {sticky: true});
+            }
+        });
+        {% endmacro %}
+    """)
+
+    def __init__(self, geojson, name=None, fields=(), aliases=(), var_name=None):
+        # Layer.__init__ reads get_name() for a missing name
+        self.var_name = var_name
+        super().__init__(name=name, overlay=True)
+        self._name = 'RiskGeoJson'
+        # '</' would close the script tag the payload is embedded in
+        self.payload = geojson.replace('</', '<\\/') if '</' in geojson else geojson
+        self.styles = FEATURE_STYLES
+        self.fields = list(fields)
+        self.aliases = list(aliases)
+
+    def get_name(self):
+        return self.var_name or super().get_name()
+
+
+def style_layer(layer_risk, risk_column):
+    """Copy of ``layer_risk`` with ``risk_class`` and ``fill_color`` columns for ``risk_column``."""
+    styled = layer_risk.copy(deep=False)
+    classes = risk_layers.risk_classes(layer_risk[risk_column])
+    styled['risk_class'] = classes
+    styled['fill_color'] = risk_layers.class_colors(classes)
+    return styled
+
+
+def feature_properties(risk_column):
+    """Properties the layer reads: GEOID to match features, the style class and the tooltip fields."""
+    return ['GEOID', 'NAME', risk_column, 'risk_class']
+
+
+def add_legend(m, legend_name):
+    StepColormap(
+        risk_layers.RISK_PALETTE,
+        index=risk_layers.RISK_THRESHOLDS,
+        vmin=risk_layers.RISK_THRESHOLDS[0],
+        vmax=risk_layers.RISK_THRESHOLDS[-1],
+        caption=legend_name,
+    ).add_to(m)
+
+
+def add_risk_layer(m, layer_risk, view_type, risk_type, geojson=None):
+    """Add the ``risk_type`` choropleth for ``layer_risk`` and its legend to map ``m``.
+
+    ``geojson`` is an already styled payload for the layer (see render_cache.py);
+    without it the layer is styled here.
+    """
+    risk_column = risk_layers.RISK_COLUMNS[risk_type]
+    legend_name = f"{risk_type} Risk Score"
+    name = f"{view_type} {risk_type} Risk"
+
+    if vector_tiles.serves(view_type):
+        # Geometry is served as vector tiles, only the colours go into the page
+        vector_tiles.add_risk_tile_layer(m, view_type, layer_risk, risk_column, name)
+    else:
+        if geojson is None:
+            styled = style_layer(layer_risk, risk_column)
+            geojson = geojson_encoding.encode(styled, feature_properties(risk_column))
+        RiskGeoJson(
+            geojson,
+            name=name,
+            fields=['NAME', risk_column],
+            aliases=[f'{view_type}:', f'{risk_type} Risk Score:'],
+        ).add_to(m)
+
+    add_legend(m, legend_name)
+    return m
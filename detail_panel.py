@@ -0,0 +1,74 @@
+"""Detail panel for the feature clicked on the risk map and the current viewport.
+
+Reads the ``st_folium`` return value of ``map_engine.show_map``, looks the
+click and the map bounds up in the spatial index and shows the risk scores
+and policy KPIs of the clicked state or county, plus a summary of what is in
+view. Only the panel is redrawn, the mounted map is left alone.
+"""
+import streamlit as st
+
+import kpi_engine
+import map_engine
+import risk_layers
+import spatial_index
+import tracing
+
+
+def selection(view_type, map_state, zoom=map_engine.ZOOM_START):
+    """(GEOID, name) of the clicked feature and the GEOIDs in the viewport; either may be None."""
+    index = spatial_index.layer_index(view_type, zoom)
+    clicked = None
+    in_view = None
+    with tracing.span('identify', view_type=view_type):
+        point = spatial_index.clicked_point(map_state)
+        if point is not None:
+            row = index.at_point(*point)
+            if row is not None:
+                clicked = (index.geoids[row], index.names[row])
+        bounds = spatial_index.viewport(map_state)
+        if bounds is not None:
+            in_view = index.geoids[index.in_bounds(*bounds)]
+    return clicked, in_view
+
+
+def show_detail_panel(view_type, year, map_state):
+    """Risk and policy breakdown of the clicked feature, and the features in view."""
+    if not map_state:
+        return
+    # The zoom the map was drawn at, which picks the hex grid resolution
+    zoom = map_state.get('zoom') or map_engine.ZOOM_START
+    clicked, in_view = selection(view_type, map_state, zoom)
+    layer = map_engine.build_layer(view_type, year, zoom)
+
+    if in_view is not None:
+        visible = layer[layer['GEOID'].isin(in_view)]
+        means = ', '.join(f"{risk_type} {visible[column].mean():.1f}"
+                          for risk_type, column in risk_layers.RISK_COLUMNS.items())
+        st.caption(f"{len(visible):,} {view_type.lower()} geographies in view, mean risk: {means}")
+
+    if clicked is None:
+        st.caption(f"Click a {view_type.lower()} on the map for its details.")
+        return
+
+    geoid, name = clicked
+    row = layer[layer['GEOID'] == geoid].iloc[0]
+    if view_type == risk_layers.HEX_VIEW:
+        # Hexagons are binned from county scores, the policy KPIs stay per state and county
+        st.subheader(name)
+        columns = st.columns(len(risk_layers.RISK_COLUMNS))
+        for column, (risk_type, risk_column) in zip(columns, risk_layers.RISK_COLUMNS.items()):
+            column.metric(f"{risk_type} Risk", f"{row[risk_column]:.1f}")
+        return
+
+    key = int(geoid)
+    kpis = (kpi_engine.portfolio_kpis(year, county=key) if view_type == 'County'
+            else kpi_engine.portfolio_kpis(year, region=[key]))
+
+    st.subheader(f"{name} ({geoid})")
+    columns = st.columns(len(risk_layers.RISK_COLUMNS) + 3)
+    for column, (risk_type, risk_column) in zip(columns, risk_layers.RISK_COLUMNS.items()):
+        column.metric(f"{risk_type} Risk", f"{row[risk_column]:.1f}")
+    metrics = columns[len(risk_layers.RISK_COLUMNS):]
+    metrics[0].metric("Policies", f"{kpis['policies']:,}")
+    metrics[1].metric("Premium ($)", f"{kpis['revenue']:,.0f}")
+    metrics[2].metric("Loss Ratio (%)", f"{kpis['loss_ratio']:.1f}")
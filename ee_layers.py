@@ -0,0 +1,117 @@
+"""Concurrent, TTL-cached resolution of Earth Engine layers to tile URLs.
+
+Adding an ee.Image to a map costs one ``getMapId`` round trip to Earth
+Engine. ``LayerResolver.resolve`` issues the requests for every missing
+layer at once on a thread pool and keeps the tile URLs for ``EE_LAYER_TTL``
+seconds, shared by all sessions, so a rerun with the same selection makes
+no remote calls at all. Concurrent requests for the same layer share one
+round trip.
+
+The Earth Engine client is passed in (``ee`` by default), so anything with
+``ImageCollection``, ``Filter.eq`` and ``getMapId`` on images can stand in
+for it, e.g. a local fake in benchmarks/bench_ee_layers.py.
+
+    urls = ee_layers.shared_resolver().nlcd_urls(['2016', '2019'])
+    Map.add_tile_layer(urls['2019'], name='NLCD 2019', attribution='Google Earth Engine')
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+NLCD_COLLECTION = "USGS/NLCD_RELEASES/2019_REL/NLCD"
+
+# Map IDs stay valid for a few hours, refresh well before that
+TTL_SECONDS = float(os.environ.get('EE_LAYER_TTL', '3600'))
+MAX_WORKERS = int(os.environ.get('EE_LAYER_WORKERS', '8'))
+
+
+def nlcd_image(client, year):
+    """NLCD land cover image of ``year`` (an epoch such as '2019')."""
+    dataset = client.ImageCollection(NLCD_COLLECTION)
+    return dataset.filter(client.Filter.eq("system:index", year)).first().select("landcover")
+
+
+class LayerResolver:
+    """Resolves (layer id, image builder, vis params) to a tile URL template, with a TTL cache."""
+
+    def __init__(self, client=None, ttl=TTL_SECONDS, max_workers=MAX_WORKERS, clock=time.monotonic):
+        self._client = client
+        self.ttl = ttl
+        self.clock = clock
+        self.remote_calls = 0
+        self._entries = {}
+        self._pending = {}
+        # Reentrant: a future that is already done runs its callback inside resolve()
+        self._lock = threading.RLock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ee-layers')
+
+    @property
+    def client(self):
+        if self._client is None:
+            import ee
+            self._client = ee
+        return self._client
+
+    def _fetch(self, build_image, vis_params):
+        image = build_image(self.client)
+        with self._lock:
+            self.remote_calls += 1
+        return image.getMapId(vis_params or {})['tile_fetcher'].url_format
+
+    def resolve(self, layers):
+        """Tile URL of every ``(layer_id, build_image, vis_params)``, fetching the missing ones concurrently.
+
+        ``build_image`` is called with the client and returns an ee.Image.
+        Returns {layer_id: url}; a failed request raises and is not cached.
+        """
+        futures = {}
+        urls = {}
+        now = self.clock()
+        with self._lock:
+            for layer_id, build_image, vis_params in layers:
+                key = (layer_id, repr(sorted((vis_params or {}).items())))
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > now:
+                    urls[layer_id] = entry[1]
+                    continue
+                future = self._pending.get(key)
+                if future is None:
+                    future = self._pool.submit(self._fetch, build_image, vis_params)
+                    self._pending[key] = future
+                    future.add_done_callback(lambda done, key=key: self._store(key, done))
+                futures[layer_id] = future
+        for layer_id, future in futures.items():
+            urls[layer_id] = future.result()
+        return urls
+
+    def _store(self, key, future):
+        with self._lock:
+            self._pending.pop(key, None)
+            if future.exception() is None:
+                self._entries[key] = (self.clock() + self.ttl, future.result())
+
+    def nlcd_urls(self, years, vis_params=None):
+        """Tile URLs of the NLCD land cover, {year: url} for each of ``years``."""
+        urls = self.resolve([
+            (f"nlcd-{year}", lambda client, year=year: nlcd_image(client, year), vis_params)
+            for year in years
+        ])
+        return {year: urls[f"nlcd-{year}"] for year in years}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_resolver():
+    """Process-wide resolver, so every session shares the cached tile URLs."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = LayerResolver()
+        return _shared
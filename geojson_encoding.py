@@ -0,0 +1,45 @@
+"""Compact GeoJSON encoding of the risk layers for the page.
+
+``GeoDataFrame.to_json`` writes every column of the Census layer (STATEFP,
+COUNTYNS, AFFGEOID, LSAD, ALAND, AWATER, ...), a feature id and coordinates
+with 15-17 significant digits. ``encode`` keeps only the properties the map
+reads (GEOID for the restyle lookup, NAME and the risk column for the
+tooltip, the risk class for the style), rounds coordinates to
+``GEOJSON_PRECISION`` decimal degrees (5 is about a metre, well below a
+screen pixel at the zoom levels the maps use) and scores to two decimals,
+and writes the JSON without whitespace. choropleth.RiskGeoJson embeds the
+string in the page as is; folium.GeoJson would parse it and write it back
+out with the default separators.
+
+The page goes to the browser over Streamlit's websocket, which is
+deflate-compressed with ``server.enableWebsocketCompression`` in
+.streamlit/config.toml; cached payloads are stored gzipped by
+render_cache.py. benchmarks/bench_geojson_encoding.py reports the bytes per
+feature of the payload and of the rendered map page.
+"""
+import os
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+PRECISION = int(os.environ.get('GEOJSON_PRECISION', '5'))
+SCORE_DECIMALS = 2
+
+
+def quantize(geometry, precision=None):
+    """GeoSeries with every coordinate rounded to ``precision`` decimals."""
+    precision = PRECISION if precision is None else precision
+    geoms = shapely.transform(np.asarray(geometry.values), lambda coords: np.round(coords, precision))
+    return gpd.GeoSeries(geoms, index=geometry.index, crs=geometry.crs)
+
+
+def encode(layer, properties, precision=None):
+    """GeoJSON FeatureCollection string of ``layer`` with only ``properties`` and quantized coordinates."""
+    compact = layer[list(properties) + [layer.geometry.name]]
+    compact = compact.set_geometry(quantize(compact.geometry, precision))
+    for column in properties:
+        if compact[column].dtype.kind == 'f':
+            compact[column] = compact[column].round(SCORE_DECIMALS)
+    # Features are matched on GEOID, the positional ids are dead weight
+    return compact.to_json(drop_id=True, separators=(',', ':'))
@@ -0,0 +1,185 @@
+"""Uniform hexagonal grid for the 'Hex' view type.
+
+County polygons vary wildly in size and carry thousands of vertices each;
+the Hex view bins the county risk scores into pointy-top hexagons of the
+same on-screen size instead. Hexagons are laid out in Web Mercator, so they
+look regular on the map, with one resolution per zoom level between
+``HEX_MIN_ZOOM`` and ``HEX_MAX_ZOOM``: ``HEX_PIXELS`` is the hexagon radius
+in screen pixels at its zoom level. The feature count depends on the grid
+alone, not on how many counties or policies sit underneath, and every
+feature is a six-vertex polygon.
+
+Each resolution is precomputed into the boundary store as ``hex@z<zoom>``
+(``boundary_store.py seed`` builds them after the county layer, like the
+simplification tiers). A stored hexagon keeps the county under each of its
+seven sample points (centre plus six towards the corners), so the risk of a
+hexagon is the mean over its samples, i.e. roughly area-weighted, and can be
+recomputed for any year without touching county geometry again.
+"""
+import math
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+import boundary_store
+import spatial_index
+
+HEX_PIXELS = float(os.environ.get('HEX_PIXELS', '12'))
+MIN_ZOOM = int(os.environ.get('HEX_MIN_ZOOM', '3'))
+# Past zoom 6 the grid over the whole US runs into tens of thousands of hexagons
+MAX_ZOOM = int(os.environ.get('HEX_MAX_ZOOM', '6'))
+RESOLUTIONS = list(range(MIN_ZOOM, MAX_ZOOM + 1))
+
+EARTH_RADIUS = 6378137.0
+# Web Mercator metres per screen pixel at zoom 0
+METERS_PER_PIXEL = 2 * math.pi * EARTH_RADIUS / 256
+
+# Corner angles of a pointy-top hexagon; samples sit part way towards them
+_ANGLES = np.radians(np.arange(6) * 60.0 - 30.0)
+SAMPLE_REACH = 0.6
+SAMPLE_COLUMNS = [f'county_{i}' for i in range(7)]
+
+# Row and column offsets packed into one positive integer id
+_OFFSET = 2 ** 20
+_STRIDE = 2 ** 21
+
+
+def resolution_for_zoom(zoom):
+    """Grid resolution drawn at ``zoom``; the finest one without a zoom."""
+    if zoom is None:
+        return MAX_ZOOM
+    return min(max(int(zoom), MIN_ZOOM), MAX_ZOOM)
+
+
+def hex_size(resolution):
+    """Hexagon radius (centre to corner) in Web Mercator metres."""
+    return HEX_PIXELS * METERS_PER_PIXEL / 2 ** resolution
+
+
+def layer_name(resolution):
+    return f"hex@z{resolution}"
+
+
+def to_mercator(lon, lat):
+    x = EARTH_RADIUS * np.radians(lon)
+    y = EARTH_RADIUS * np.log(np.tan(np.pi / 4 + np.radians(lat) / 2))
+    return x, y
+
+
+def from_mercator(x, y):
+    lon = np.degrees(x / EARTH_RADIUS)
+    lat = np.degrees(2 * np.arctan(np.exp(y / EARTH_RADIUS)) - np.pi / 2)
+    return lon, lat
+
+
+def cell_centers(rows, cols, size):
+    """Mercator centres of the cells; odd rows are shifted half a hexagon right."""
+    width = math.sqrt(3) * size
+    return width * (cols + 0.5 * (rows & 1)), 1.5 * size * rows
+
+
+def cell_ids(rows, cols):
+    return (rows + _OFFSET) * _STRIDE + (cols + _OFFSET)
+
+
+def covering_cells(geometry, size):
+    """Unique (rows, cols) of every cell touching the bounding box of a polygon part of ``geometry``.
+
+    Parts are covered one by one so a county split at the antimeridian does
+    not span the whole globe.
+    """
+    parts = shapely.get_parts(np.asarray(geometry.values))
+    west, south, east, north = shapely.bounds(parts).T
+    x0, y0 = to_mercator(west, south)
+    x1, y1 = to_mercator(east, north)
+    width, height = math.sqrt(3) * size, 1.5 * size
+    # One cell of margin covers the half-hexagon shift of odd rows
+    row0, row1 = np.floor(y0 / height).astype(np.int64) - 1, np.ceil(y1 / height).astype(np.int64) + 1
+    col0, col1 = np.floor(x0 / width).astype(np.int64) - 1, np.ceil(x1 / width).astype(np.int64) + 1
+    ids = [cell_ids(*np.mgrid[r0:r1 + 1, c0:c1 + 1].reshape(2, -1))
+           for r0, r1, c0, c1 in zip(row0, row1, col0, col1)]
+    ids = np.unique(np.concatenate(ids))
+    return ids // _STRIDE - _OFFSET, ids % _STRIDE - _OFFSET
+
+
+def hex_polygons(rows, cols, size, decimals=5):
+    """Six-vertex lon/lat polygons of the cells, coordinates rounded to ``decimals``."""
+    cx, cy = cell_centers(rows, cols, size)
+    x = cx[:, None] + size * np.cos(_ANGLES)
+    y = cy[:, None] + size * np.sin(_ANGLES)
+    lon, lat = from_mercator(x, y)
+    ring = np.stack([lon, lat], axis=-1).round(decimals)
+    return shapely.polygons(ring)
+
+
+def build_hex_layer(resolution, store_dir=None):
+    """Precompute the grid at ``resolution`` over the county layer and write it to the store."""
+    counties = boundary_store.load_layer('county', store_dir=store_dir)
+    index = spatial_index.SpatialIndex(counties)
+    size = hex_size(resolution)
+    rows, cols = covering_cells(counties.geometry, size)
+
+    cx, cy = cell_centers(rows, cols, size)
+    reach = SAMPLE_REACH * size
+    sx = np.column_stack([cx] + [cx + reach * np.cos(a) for a in _ANGLES])
+    sy = np.column_stack([cy] + [cy + reach * np.sin(a) for a in _ANGLES])
+    positions = index.locate(*from_mercator(sx.ravel(), sy.ravel())).reshape(sx.shape)
+    inside = (positions >= 0).any(axis=1)
+    positions, rows, cols = positions[inside], rows[inside], cols[inside]
+
+    samples = np.where(positions >= 0, index.keys[positions], -1)
+    # Named after the county under the first sample that has one, the centre if any
+    first = np.argmax(positions >= 0, axis=1)
+    names = index.names[positions[np.arange(len(positions)), first]]
+    hexes = gpd.GeoDataFrame(
+        {'GEOID': cell_ids(rows, cols).astype(str), 'NAME': [f"Around {name}" for name in names]},
+        geometry=hex_polygons(rows, cols, size), crs=counties.crs)
+    for i, column in enumerate(SAMPLE_COLUMNS):
+        hexes[column] = samples[:, i]
+
+    base = boundary_store.read_manifest(store_dir)['layers']['county']
+    boundary_store.write_layer(hexes, layer_name(resolution), store_dir, {
+        'base_layer': 'county',
+        'base_imported_at': base['imported_at'],
+        'hex_size': size,
+    })
+    return hexes
+
+
+def hex_layer_is_current(resolution, store_dir=None):
+    """True if the stored grid was built from the current county layer at the current size."""
+    name = layer_name(resolution)
+    if not boundary_store.has_layer(name, store_dir):
+        return False
+    layers = boundary_store.read_manifest(store_dir)['layers']
+    entry = layers[name]
+    return (entry.get('base_imported_at') == layers.get('county', {}).get('imported_at')
+            and entry.get('hex_size') == hex_size(resolution))
+
+
+def load_hex_layer(resolution, store_dir=None):
+    """Stored grid at ``resolution``, built on first use."""
+    if not hex_layer_is_current(resolution, store_dir):
+        build_hex_layer(resolution, store_dir)
+    return boundary_store.load_layer(layer_name(resolution), store_dir=store_dir)
+
+
+def hex_risk_table(hexes, county_table, columns):
+    """Mean of the county ``columns`` over each hexagon's samples, keyed like a risk table.
+
+    Samples outside every county, or on a county without a score, are left
+    out of the mean; hexagons with none left get NaN.
+    """
+    samples = hexes[SAMPLE_COLUMNS].to_numpy()
+    scores = county_table.set_index('geoid_key')
+    table = pd.DataFrame({'geoid_key': pd.to_numeric(hexes['GEOID']).to_numpy(dtype=np.int64)})
+    for column in columns:
+        values = scores[column].reindex(samples.ravel()).to_numpy(dtype=float).reshape(samples.shape)
+        present = ~np.isnan(values)
+        counts = present.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            table[column] = np.where(present, values, 0.0).sum(axis=1) / counts
+    return table
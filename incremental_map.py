@@ -0,0 +1,192 @@
+"""Incremental risk map updates through streamlit-folium's dynamic feature group.
+
+The geometry payload is rendered once into the shared render cache; each
+rerun wraps it in a light folium.Map with the basemap and legend, built at the
+same view and handed to ``st_folium`` under the same key, so the script is
+unchanged and the client keeps the map mounted. The payload carries only
+GEOID, NAME and the shapes; the scores and colours for the selected peril
+and year, including the first ones, go in a small feature group holding a
+GEOID -> score / colour lookup, whose script styles the existing geometry
+layer in place and sets the tooltip values. Peril and year toggles send only
+that, no geometry is re-serialized or re-parsed.
+
+The zoom level and centre the user leaves the map at are kept across reruns
+(``live_view``), so the geometry follows the zoom: once it crosses into
+another simplification tier (or hex grid resolution) the map is rebuilt
+from that tier at the same view.
+
+Needs streamlit-folium >= 0.15 for ``feature_group_to_add``. The vector tile
+mode (``MAP_VECTOR_TILES=1``) keeps the full rebuild path.
+"""
+import math
+
+import folium
+import streamlit as st
+from branca.element import MacroElement
+from jinja2 import Template
+from streamlit_folium import st_folium
+
+import choropleth
+import geojson_encoding
+import map_engine
+import render_cache
+import risk_layers
+import tracing
+
+# Session state: key of the mounted st_folium component, the last (center, zoom) it
+# reported, and the (center, zoom) each component key was first built at
+COMPONENT_STATE = 'risk_map_component'
+VIEW_STATE = 'risk_map_view'
+MOUNT_STATE = 'risk_map_mounts'
+# Fixed JavaScript name of the geometry layer, which RiskRestyle looks up
+GEOMETRY_VAR = 'risk_geometry_layer'
+
+
+class RiskRestyle(MacroElement):
+    """Script that colours an existing GeoJSON layer and sets its tooltip values from a GEOID lookup."""
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var scores = {{ this.scores|tojson }};
+            var colors = {{ this.colors|tojson }};
+            {{ this.layer_name }}.eachLayer(function(layer) {
+                var key = layer.feature.properties.GEOID;
+                layer.feature.properties.peril = {{ this.peril|tojson }};
+                layer.feature.properties.risk_score = scores[key];
+                layer.setStyle({fillColor: colors[key] || {{ this.nan_color|tojson }}});
+            });
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, layer_name, keys, scores, colors, peril):
+        super().__init__()
+        self._name = 'RiskRestyle'
+        self.layer_name = layer_name
+        # NaN is not valid JSON, missing scores go out as null
+        self.scores = {key: None if math.isnan(score) else float(score) for key, score in zip(keys, scores)}
+        self.colors = dict(zip(keys, colors))
+        self.peril = peril
+        self.nan_color = risk_layers.NAN_COLOR
+
+
+def geometry_geojson(view_type, zoom=4):
+    """GeoJSON of the ``view_type`` boundaries at the tier for ``zoom``, with only GEOID and NAME.
+
+    Nothing in it depends on the peril or year, so the map script stays the
+    same across toggles; RiskRestyle sends the scores and colours.
+    """
+    boundaries = risk_layers.load_boundaries(view_type, risk_layers.layer_tier(view_type, zoom))
+    with tracing.span('serialize', kind='geometry'):
+        return geojson_encoding.encode(boundaries, ['GEOID', 'NAME'])
+
+
+def geometry_payload(view_type, zoom=4):
+    """Render-cached GeoJSON of the geometry layer at the tier for ``zoom``."""
+    return render_cache.shared_cache().get_or_render(
+        'geometry', lambda: geometry_geojson(view_type, zoom),
+        view_type=view_type, tier=risk_layers.layer_tier(view_type, zoom))
+
+
+def add_geometry_layer(m, view_type, zoom=4):
+    """Add the stable, unstyled geometry layer; returns the layer.
+
+    The payload lives only in the shared render cache; the layer embeds that
+    string as is, so building it copies no geometry.
+    """
+    geometry = choropleth.RiskGeoJson(
+        geometry_payload(view_type, zoom),
+        name=f"{view_type} Risk",
+        fields=['NAME', 'peril', 'risk_score'],
+        aliases=[f'{view_type}:', 'Peril:', 'Risk Score:'],
+        var_name=GEOMETRY_VAR,
+    )
+    geometry.add_to(m)
+    return geometry
+
+
+def live_view(zoom=None):
+    """(center, zoom) the user left the risk map at, from the last ``st_folium`` value.
+
+    Before any interaction it is the default view, at ``zoom`` if given.
+    """
+    default_view = (map_engine.MAP_CENTER, zoom or map_engine.ZOOM_START)
+    center, default_zoom = st.session_state.get(VIEW_STATE, default_view)
+    state = st.session_state.get(st.session_state.get(COMPONENT_STATE)) or {}
+    if state.get('zoom') is not None:
+        if state.get('center'):
+            center = [state['center']['lat'], state['center']['lng']]
+        st.session_state[VIEW_STATE] = (center, int(state['zoom']))
+        return center, int(state['zoom'])
+    return center, default_zoom
+
+
+def mount_view(key, center, zoom):
+    """(center, zoom) the component under ``key`` was first built at.
+
+    The map script has to stay the same for the client to keep the map
+    mounted, so it always opens at this view; the live view goes to
+    ``st_folium`` separately.
+    """
+    mounts = st.session_state.setdefault(MOUNT_STATE, {})
+    return mounts.setdefault(key, (center, zoom))
+
+
+def base_map(view_type, zoom=4, center=None):
+    """Map and geometry layer for ``view_type`` at the tier for ``zoom``.
+
+    Built on every rerun: the geometry payload comes from the shared render
+    cache, so the map itself is a light wrapper and no session keeps a copy.
+    """
+    tier = risk_layers.layer_tier(view_type, zoom)
+    with tracing.span('base_map', view_type=view_type, tier=tier):
+        m = map_engine.base_map(zoom, view_type, center)
+        geometry = add_geometry_layer(m, view_type, zoom)
+        choropleth.add_legend(m, "Risk Score")
+        folium.LayerControl().add_to(m)
+    return m, geometry
+
+
+def risk_update(geometry, layer_risk, risk_type):
+    """Feature group carrying only the per-feature scores and colours for ``risk_type``."""
+    risk_column = risk_layers.RISK_COLUMNS[risk_type]
+    scores = layer_risk[risk_column].to_numpy(dtype=float)
+    group = folium.FeatureGroup(name=f"{risk_type} Risk", control=False)
+    RiskRestyle(geometry.get_name(), layer_risk['GEOID'].tolist(), scores,
+                risk_layers.risk_colors(scores).tolist(), risk_type).add_to(group)
+    return group
+
+
+def risk_map(view_type, risk_type, year, zoom, mount):
+    """Map built at the ``mount`` (center, zoom) view, and the update styling it for ``risk_type`` and ``year``."""
+    mount_center, mount_zoom = mount
+    m, geometry = base_map(view_type, mount_zoom, mount_center)
+    layer_risk = map_engine.build_layer(view_type, year, zoom)
+    with tracing.span('style', risk_type=risk_type, rows=len(layer_risk)):
+        update = risk_update(geometry, layer_risk, risk_type)
+    return m, update
+
+
+def show_risk_map(view_type, risk_type, year=None, zoom=None, width=700, height=500):
+    """Display the risk map, reusing the mounted map and sending only the new values.
+
+    Without ``zoom`` the geometry tier follows the zoom level of the live map.
+    """
+    center, zoom = live_view(zoom)
+    tier = risk_layers.layer_tier(view_type, zoom)
+    key = f"risk_map_{view_type}_{tier}"
+    st.session_state[COMPONENT_STATE] = key
+    m, update = risk_map(view_type, risk_type, year, zoom, mount_view(key, center, zoom))
+    # Serializing the map for the component and the round trip to the browser
+    with tracing.span('transfer'):
+        return st_folium(
+            m,
+            key=key,
+            feature_group_to_add=update,
+            # The map opens at its mount view, this moves it to where the user is now
+            center=center,
+            zoom=zoom,
+            width=width,
+            height=height,
+        )
@@ -0,0 +1,115 @@
+"""Portfolio KPIs for the dashboard tiles, computed from policy rows.
+
+All metrics come out of one pass over the policy data: every batch adds its
+column sums (a single numpy reduction over policies, premium, claims and
+expenses) and its distinct customers to a running ``KpiAccumulator``. The
+rows are streamed from the risk data provider in ``KPI_BATCH_ROWS`` batches,
+so a Parquet dataset larger than memory is aggregated one record batch at a
+time. Results are cached per (year, region) filter and provider version in
+the shared resource cache.
+
+    kpis = kpi_engine.portfolio_kpis(year=2022)
+    kpis['loss_ratio']
+"""
+import os
+
+import numpy as np
+
+import resource_cache
+import risk_data
+import tracing
+
+KPI_BATCH_ROWS = int(os.environ.get('KPI_BATCH_ROWS', '1000000'))
+
+SUM_COLUMNS = ['premium', 'claims', 'expenses']
+KPI_COLUMNS = ['customer_id'] + SUM_COLUMNS
+
+# Merge the per-batch customer ids once this many are pending
+_UNIQUE_FLUSH = 4_000_000
+
+
+class KpiAccumulator:
+    """Running totals over policy batches; ``result()`` turns them into KPIs."""
+
+    def __init__(self):
+        self.policies = 0
+        self.sums = np.zeros(len(SUM_COLUMNS))
+        self._customers = np.empty(0, dtype=np.int64)
+        self._pending = []
+        self._pending_rows = 0
+
+    def update(self, batch):
+        self.policies += len(batch)
+        self.sums += batch[SUM_COLUMNS].to_numpy(dtype=float).sum(axis=0)
+        ids = np.unique(batch['customer_id'].to_numpy(dtype=np.int64))
+        self._pending.append(ids)
+        self._pending_rows += len(ids)
+        if self._pending_rows >= _UNIQUE_FLUSH:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            self._customers = np.unique(np.concatenate([self._customers] + self._pending))
+            self._pending = []
+            self._pending_rows = 0
+
+    def result(self):
+        self._flush()
+        premium, claims, expenses = self.sums
+        outlay = claims + expenses
+        return {
+            'policies': self.policies,
+            'customers': len(self._customers),
+            'revenue': premium,
+            'claims': claims,
+            'expenses': expenses,
+            'avg_premium': premium / self.policies if self.policies else float('nan'),
+            'loss_ratio': _percent(claims, premium),
+            'expense_ratio': _percent(expenses, premium),
+            'combined_ratio': _percent(outlay, premium),
+            # Underwriting profit over what was paid out for it
+            'roi': _percent(premium - outlay, outlay),
+        }
+
+
+def _percent(numerator, denominator):
+    return 100 * numerator / denominator if denominator else float('nan')
+
+
+def compute_kpis(batches):
+    """KPIs over an iterable of policy DataFrames with the KPI_COLUMNS."""
+    accumulator = KpiAccumulator()
+    for batch in batches:
+        accumulator.update(batch)
+    return accumulator.result()
+
+
+def policy_source():
+    """Provider to read policy rows from; a risk cube only has aggregates, so fall back to policies."""
+    provider = risk_data.get_provider()
+    return provider if provider.has_policies else risk_data.policy_provider()
+
+
+def portfolio_kpis(year=None, region=None, county=None):
+    """KPIs for ``year`` and ``region`` (state FIPS codes), or the whole book; shared across sessions.
+
+    ``county`` (a county FIPS code) narrows it down to one county.
+    """
+    provider = policy_source()
+    if county is not None:
+        county = int(county)
+        # The scan can only filter on states, counties are picked out of each batch
+        region = [county // 1000]
+    region = tuple(sorted(int(code) for code in region)) if region is not None else None
+    key = ('kpis', year, region, county, provider.version())
+
+    def batches():
+        columns = KPI_COLUMNS + ['county_key'] if county is not None else KPI_COLUMNS
+        for batch in provider.iter_policies(year, region, columns, KPI_BATCH_ROWS):
+            yield batch[batch['county_key'].to_numpy() == county] if county is not None else batch
+
+    def load():
+        with tracing.span('aggregate_kpis', year=year):
+            return compute_kpis(batches())
+
+    return resource_cache.shared_cache().get_or_load(key, load)
@@ -0,0 +1,49 @@
+"""Deferred module imports for the Streamlit entry points.
+
+``lazy_import('map_engine')`` returns a stand-in module whose real import
+only runs on first attribute access, so a page pays for its heavy
+dependencies (folium, geopandas...) only when it actually uses them, and
+the other pages start without them:
+
+    map_engine = lazy_import('map_engine')
+    ...
+    map_engine.show_map(...)   # folium, geopandas etc. are imported here
+
+A missing module therefore raises ImportError at first use, not at import
+time. benchmarks/bench_startup.py measures what each page imports.
+"""
+import importlib
+import sys
+import threading
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Proxy for a module that is imported the first time one of its attributes is read."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_lazy_lock'] = threading.Lock()
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self):
+        with self._lazy_lock:
+            if self._lazy_module is None:
+                self.__dict__['_lazy_module'] = importlib.import_module(self.__name__)
+            return self._lazy_module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self._lazy_module is not None else 'not loaded'
+        return f"<lazy module {self.__name__!r} ({state})>"
+
+
+def lazy_import(name):
+    """Module ``name``: the module itself if already imported, a LazyModule otherwise."""
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
@@ -0,0 +1,125 @@
+"""Risk map engine shared by dashboard.py, deploy.py, app_pages.py and old_app.
+
+The stable API, in pipeline order:
+
+    build_layer(view_type, year, zoom)   boundaries with risk scores merged on
+    style_layer(layer, risk_type)        vectorized risk classes and fill colours
+    layer_geojson(...)                   styled layer payload, render-cached
+    render_map(...)                      folium.Map for a selection
+    render_html(...)                     standalone map page, render-cached
+    show_map(...)                        display in Streamlit
+
+Each stage runs in a tracing span (see tracing.py), so a slow rerun can be
+broken down into load, merge, style, serialize, render and transfer time.
+
+Every performance change to map construction belongs here (or in the
+modules it calls), not in the apps. tests/test_map_engine_stages.py times
+each stage offline with pytest-benchmark.
+"""
+import folium
+
+import choropleth
+import geojson_encoding
+import render_cache
+import risk_layers
+import tile_proxy
+import tracing
+import vector_tiles
+
+VIEW_TYPES = risk_layers.VIEW_TYPES
+RISK_TYPES = list(risk_layers.RISK_COLUMNS)
+
+MAP_CENTER = [37.0902, -95.7129]
+ZOOM_START = 4
+BASEMAP = "cartodbpositron"
+MAP_WIDTH = 700
+MAP_HEIGHT = 500
+
+
+def build_layer(view_type, year=None, zoom=ZOOM_START):
+    """Boundaries for ``view_type`` (simplified for ``zoom``) with the ``year`` risk scores."""
+    with tracing.span('build_layer', view_type=view_type, year=year, zoom=zoom):
+        return risk_layers.load_risk_layer(view_type, zoom=zoom, year=year)
+
+
+def style_layer(layer, risk_type):
+    """Copy of ``layer`` with ``risk_class`` and ``fill_color`` for ``risk_type``."""
+    with tracing.span('style', risk_type=risk_type, rows=len(layer)):
+        return choropleth.style_layer(layer, risk_layers.RISK_COLUMNS[risk_type])
+
+
+def layer_geojson(view_type, risk_type, year=None, zoom=ZOOM_START):
+    """Styled GeoJSON FeatureCollection of the risk layer, as a compact string (see geojson_encoding.py)."""
+    def render():
+        styled = style_layer(build_layer(view_type, year, zoom), risk_type)
+        with tracing.span('serialize', kind='geojson'):
+            return geojson_encoding.encode(
+                styled, choropleth.feature_properties(risk_layers.RISK_COLUMNS[risk_type]))
+
+    # Every zoom level of a tier shares the payload
+    return render_cache.shared_cache().get_or_render(
+        'geojson', render, view_type=view_type, risk_type=risk_type, year=year,
+        tier=risk_layers.layer_tier(view_type, zoom))
+
+
+def base_map(zoom=ZOOM_START, view_type=None, center=None):
+    # The hex grid is thousands of small polygons, cheaper to draw on one canvas than as SVG paths
+    prefer_canvas = view_type == risk_layers.HEX_VIEW
+    location = center or MAP_CENTER
+    if tile_proxy.ENABLED:
+        # Basemap tiles through the local caching proxy instead of upstream
+        tiles, attribution = tile_proxy.proxied_tiles(BASEMAP)
+        return folium.Map(location=location, zoom_start=zoom, tiles=tiles, attr=attribution,
+                          prefer_canvas=prefer_canvas)
+    return folium.Map(location=location, zoom_start=zoom, tiles=BASEMAP, prefer_canvas=prefer_canvas)
+
+
+def render_map(view_type, risk_type, year=None, zoom=ZOOM_START):
+    """Build the folium risk map for a selection."""
+    with tracing.span('render_map', view_type=view_type, risk_type=risk_type):
+        return _render_map(view_type, risk_type, year, zoom)
+
+
+def _render_map(view_type, risk_type, year, zoom):
+    m = base_map(zoom, view_type)
+    layer = build_layer(view_type, year, zoom)
+    geojson = None if vector_tiles.serves(view_type) else layer_geojson(view_type, risk_type, year, zoom)
+    # One GeoJson layer carries the fill colour, classing and tooltip
+    choropleth.add_risk_layer(m, layer, view_type, risk_type, geojson=geojson)
+    folium.LayerControl().add_to(m)
+    return m
+
+
+def render_html(view_type, risk_type, year=None, zoom=ZOOM_START):
+    """Complete standalone HTML page of the risk map."""
+    def render():
+        m = render_map(view_type, risk_type, year, zoom)
+        with tracing.span('serialize', kind='html'):
+            return m.get_root().render()
+
+    return render_cache.shared_cache().get_or_render(
+        'html', render, view_type=view_type, risk_type=risk_type, year=year, zoom=zoom)
+
+
+def show_map(view_type, risk_type, year=None, zoom=None, width=MAP_WIDTH, height=MAP_HEIGHT):
+    """Display the risk map in the current Streamlit app.
+
+    Without ``zoom`` the geometry follows the zoom level the user is at.
+    """
+    with tracing.span('show_map', view_type=view_type, risk_type=risk_type, year=year):
+        if tile_proxy.ENABLED:
+            # Cached pages and session maps point at it without rebuilding the base map
+            tile_proxy.ensure_server()
+        if vector_tiles.serves(view_type):
+            import streamlit.components.v1 as components
+
+            # Prerendered page from the render cache, tiles come from the tile server
+            # Tiles follow the zoom on their own, the page opens at the default view
+            html = render_html(view_type, risk_type, year, zoom or ZOOM_START)
+            with tracing.span('transfer', bytes=len(html)):
+                return components.html(html, width=width, height=height)
+
+        import incremental_map
+
+        # Keeps the mounted map and only sends new colours on risk type and year changes
+        return incremental_map.show_risk_map(view_type, risk_type, year, zoom, width=width, height=height)
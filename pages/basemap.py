@@ -1,6 +1,8 @@
 import streamlit as st
 import geemap.foliumap as geemap
 
+import tile_proxy
+
 st.title("Interactive Map")
 
 col1, col2 = st.columns([4, 1])
@@ -15,5 +17,5 @@ with col2:
 with col1:
 
     m = geemap.Map()
-    m.add_basemap(basemap)
+    tile_proxy.add_basemap(m, basemap)
     m.to_streamlit(height=700)
@@ -1,19 +1,7 @@
-import ee
 import streamlit as st
 import geemap.foliumap as geemap
 
-# Get an NLCD image by year.
-def getNLCD(year):
-    # Import the NLCD collection.
-    dataset = ee.ImageCollection("USGS/NLCD_RELEASES/2019_REL/NLCD")
-
-    # Filter the collection by year.
-    nlcd = dataset.filter(ee.Filter.eq("system:index", year)).first()
-
-    # Select the land cover band.
-    landcover = nlcd.select("landcover")
-    return landcover
-
+import ee_layers
 
 st.header("National Land Cover Database (NLCD)")
 
@@ -33,8 +21,10 @@ with row1_col2:
 
 # Add selected NLCD image to the map based on the selected year.
 if selected_year:
+    # All map IDs are requested at once, and reused across reruns and sessions
+    tile_urls = ee_layers.shared_resolver().nlcd_urls(selected_year)
     for year in selected_year:
-        Map.addLayer(getNLCD(year), {}, "NLCD " + year)
+        Map.add_tile_layer(tile_urls[year], name="NLCD " + year, attribution="Google Earth Engine")
 
     if add_legend:
         Map.add_legend(
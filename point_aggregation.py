@@ -0,0 +1,204 @@
+"""Spatial join of geocoded policy points to counties and states, in bulk.
+
+Real policy data comes as points (lon, lat) with an exposure value rather
+than with FIPS codes. ``assign_counties`` joins them to the county
+polygons with one STRtree query per chunk of ``POINT_CHUNK_SIZE`` points
+(see spatial_index.SpatialIndex.locate), optionally fanned out over a
+process pool of ``POINT_AGGREGATION_WORKERS`` workers. States follow from
+the county FIPS code, so one join serves both view types.
+``geography_stats`` then turns the joined points into per-geography policy
+counts, exposure, exposure-weighted risk scores and high-risk exposure.
+
+``PointRiskProvider`` reads a hive-partitioned Parquet dataset of points
+with the schema
+
+    year        int16    policy year
+    lon, lat    float64  policy location, EPSG:4269
+    exposure    float64  insured value in $
+    earthquake_score, flood_score   float32, 1-10
+    customer_id int64    policyholder
+    premium, claims, expenses       float64, $
+
+and serves the joined statistics to the maps. With ``RISK_POINTS_PATH`` set
+it is also where the dashboard reads its KPIs from (kpi_engine.py), so the
+customer and financial columns are required too. Point ``RISK_POINTS_PATH`` at such a dataset, or
+write a synthetic one with:
+
+    python point_aggregation.py synth --out data/points --points 1000000
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import boundary_store
+import resource_cache
+import risk_data
+import risk_layers
+import spatial_index
+
+CHUNK_POINTS = int(os.environ.get('POINT_CHUNK_SIZE', '1000000'))
+# 0 joins in-process; more than one chunk is needed for the pool to pay off
+WORKERS = int(os.environ.get('POINT_AGGREGATION_WORKERS', '0'))
+
+# Scores at or above this count as high risk (the top legend class)
+HIGH_RISK_SCORE = risk_layers.RISK_THRESHOLDS[-2]
+
+_worker_index = None
+
+
+def _init_worker(store_dir):
+    global _worker_index
+    _worker_index = spatial_index.SpatialIndex(boundary_store.load_layer('county', store_dir=store_dir))
+
+
+def _locate_chunk(lon, lat):
+    positions = _worker_index.locate(lon, lat)
+    return np.where(positions >= 0, _worker_index.keys[positions], -1)
+
+
+def assign_counties(lon, lat, workers=None, chunk_size=None):
+    """County FIPS key (int64) of each point, -1 for points outside every county."""
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    workers = WORKERS if workers is None else workers
+    chunk_size = chunk_size or CHUNK_POINTS
+    starts = range(0, len(lon), chunk_size)
+    if workers > 1 and len(starts) > 1:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(boundary_store.STORE_DIR,)) as pool:
+            parts = pool.map(_locate_chunk, (lon[s:s + chunk_size] for s in starts),
+                             (lat[s:s + chunk_size] for s in starts))
+            return np.concatenate(list(parts))
+
+    index = spatial_index.layer_index('County')
+    keys = np.full(len(lon), -1, dtype=np.int64)
+    for start in starts:
+        positions = index.locate(lon[start:start + chunk_size], lat[start:start + chunk_size])
+        inside = positions >= 0
+        keys[start:start + chunk_size][inside] = index.keys[positions[inside]]
+    return keys
+
+
+def join_points(points, workers=None, chunk_size=None):
+    """``points`` with lon/lat replaced by county_key and state_key; points outside every county dropped."""
+    county_key = assign_counties(points['lon'], points['lat'], workers, chunk_size)
+    joined = points.drop(columns=['lon', 'lat']).assign(county_key=county_key, state_key=county_key // 1000)
+    return joined[county_key >= 0]
+
+
+def geography_stats(policies, view_type):
+    """Per-geography policies, exposure, exposure-weighted scores and high-risk exposure share."""
+    key_column = risk_data.GEO_KEY_COLUMNS[view_type]
+    exposure = policies['exposure'].to_numpy(dtype=float)
+    columns = {'policies': np.ones(len(policies)), 'exposure': exposure}
+    for name, column in risk_data.SCORE_COLUMNS.items():
+        scores = policies[column].to_numpy(dtype=float)
+        columns[f'{name}_weighted'] = scores * exposure
+        columns[f'{name}_high'] = np.where(scores >= HIGH_RISK_SCORE, exposure, 0.0)
+    sums = pd.DataFrame(columns).groupby(policies[key_column].to_numpy(), sort=True).sum()
+
+    stats = pd.DataFrame({'policies': sums['policies'].astype(np.int64), 'exposure': sums['exposure']})
+    for name in risk_data.SCORE_COLUMNS:
+        stats[name] = sums[f'{name}_weighted'] / sums['exposure']
+        stats[name.replace('_Score', '_High_Exposure_Share')] = sums[f'{name}_high'] / sums['exposure']
+    stats.index = stats.index.astype(np.int64)
+    return stats.rename_axis('geoid_key').reset_index()
+
+
+class PointRiskProvider(risk_data.ParquetRiskProvider):
+    """Policy points joined to counties on read; risk tables are exposure-weighted."""
+
+    def _read_columns(self, columns):
+        if columns is None:
+            return None
+        geo = set(risk_data.GEO_KEY_COLUMNS.values())
+        return [c for c in columns if c not in geo] + ['lon', 'lat']
+
+    def _joined(self, frame, region, columns):
+        joined = join_points(frame)
+        if region is not None:
+            joined = joined[joined['state_key'].isin([int(code) for code in region])]
+        return joined[columns] if columns else joined
+
+    def read_policies(self, year=None, region=None, columns=None):
+        # Regions are only known after the join, so only the year is pushed down
+        table = self.dataset.to_table(columns=self._read_columns(columns), filter=self._predicate(year, None))
+        return self._joined(table.to_pandas(), region, columns)
+
+    def iter_policies(self, year=None, region=None, columns=None, batch_rows=1_000_000):
+        for batch in self.dataset.to_batches(columns=self._read_columns(columns),
+                                             filter=self._predicate(year, None), batch_size=batch_rows):
+            if batch.num_rows:
+                yield self._joined(batch.to_pandas(), region, columns)
+
+    def risk_scores(self, view_type, year=None, region=None):
+        key = ('point_stats', self.path, view_type, year, region and tuple(region), self.version())
+        columns = [risk_data.GEO_KEY_COLUMNS[view_type], 'exposure'] + list(risk_data.SCORE_COLUMNS.values())
+        return resource_cache.shared_cache().get_or_load(
+            key, lambda: geography_stats(self.read_policies(year, region, columns), view_type))
+
+    def version(self):
+        # The join depends on the boundaries as much as on the points
+        return 'points-' + super().version() + '-' + boundary_store.data_version()
+
+
+def synthetic_points(n, years=risk_data.YEARS, seed=42, bounds=None):
+    """``n`` random policy points per year, uniform over ``bounds`` (the county layer's by default).
+
+    The same ``n`` policyholders renew every year; their financials come from
+    their own random stream, as in risk_data.synthetic_policies.
+    """
+    if bounds is None:
+        bounds = boundary_store.load_layer('county', columns=['geometry']).total_bounds
+    west, south, east, north = bounds
+    rng = np.random.RandomState(seed)
+    money_rng = np.random.RandomState(seed + 1)
+    frames = []
+    for year in years:
+        frames.append(pd.DataFrame({
+            'year': np.full(n, year, dtype=np.int16),
+            'lon': rng.uniform(west, east, n),
+            'lat': rng.uniform(south, north, n),
+            'exposure': rng.lognormal(12, 1, n).round(2),
+            'earthquake_score': rng.randint(1, 11, size=n).astype(np.float32),
+            'flood_score': rng.randint(1, 11, size=n).astype(np.float32),
+            'customer_id': np.arange(n, dtype=np.int64),
+            **risk_data.synthetic_financials(money_rng, n),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    synth = subparsers.add_parser('synth', help='Write a synthetic policy point dataset')
+    synth.add_argument('--out', required=True, help='Dataset directory')
+    synth.add_argument('--points', type=int, default=1_000_000, help='Points per year')
+    synth.add_argument('--years', type=int, nargs='+', default=risk_data.YEARS)
+    synth.add_argument('--seed', type=int, default=42)
+
+    aggregate = subparsers.add_parser('aggregate', help='Print per-geography statistics of a point dataset')
+    aggregate.add_argument('--path', default=risk_data.RISK_POINTS_PATH, help='Dataset directory')
+    aggregate.add_argument('--view', choices=list(risk_data.GEO_KEY_COLUMNS), default='County')
+    aggregate.add_argument('--year', type=int, default=None)
+
+    args = parser.parse_args(argv)
+    if args.command == 'synth':
+        points = synthetic_points(args.points, args.years, args.seed)
+        risk_data.write_dataset(points, args.out)
+        print(f"{len(points):,} points -> {args.out}")
+    elif args.command == 'aggregate':
+        if not args.path:
+            parser.error('--path or RISK_POINTS_PATH is required')
+        stats = PointRiskProvider(args.path).risk_scores(args.view, year=args.year)
+        print(stats.to_string(index=False, max_rows=40))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,252 @@
+"""Content-addressed cache of rendered map HTML and GeoJSON payloads.
+
+The sidebar only allows a handful of maps (view type x risk type x year), so
+the expensive outputs of map construction are cached under a key that hashes
+the selection together with the boundary data version, the risk data
+version and ``RENDER_VERSION``. Entries live in an in-memory LRU (shared by
+all sessions, budget ``RENDER_CACHE_MAX_MB``) backed by gzipped files in
+``RENDER_CACHE_DIR``, which survive restarts and can be prerendered at
+deploy time. The disk tier is limited to ``RENDER_CACHE_DISK_MAX_MB``,
+evicting the least recently used files, and files older than
+``RENDER_CACHE_MAX_AGE_DAYS`` are dropped (entries of an old data or render
+version never match again):
+
+    python render_cache.py warm
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+import boundary_store
+import geojson_encoding
+import resource_cache
+import risk_data
+import tile_proxy
+import vector_tiles
+
+# Bump whenever map rendering changes so old entries stop matching
+RENDER_VERSION = 4
+
+CACHE_DIR = os.environ.get(
+    'RENDER_CACHE_DIR', os.path.join(os.path.dirname(boundary_store.STORE_DIR), 'render_cache'))
+MAX_MB = float(os.environ.get('RENDER_CACHE_MAX_MB', '256'))
+DISK_MAX_MB = float(os.environ.get('RENDER_CACHE_DISK_MAX_MB', '1024'))
+MAX_AGE_DAYS = float(os.environ.get('RENDER_CACHE_MAX_AGE_DAYS', '30'))
+
+
+class RenderCache:
+    """Two-tier (memory, disk) cache of rendered strings with hit and latency counters."""
+
+    def __init__(self, max_bytes, cache_dir, disk_max_bytes=None, max_age=None):
+        self.memory = resource_cache.ResourceCache(max_bytes)
+        self.cache_dir = cache_dir
+        self.disk_max_bytes = int(DISK_MAX_MB * 1024 * 1024) if disk_max_bytes is None else disk_max_bytes
+        self.max_age = MAX_AGE_DAYS * 86400 if max_age is None else max_age
+        self.disk_hits = 0
+        self.disk_bytes = 0
+        self.disk_evictions = 0
+        self.renders = 0
+        self.latencies = deque(maxlen=1000)
+        self._disk = OrderedDict()
+        self._disk_root = None
+        self._lock = threading.Lock()
+
+    def key(self, kind, **params):
+        payload = dict(
+            params,
+            kind=kind,
+            render_version=RENDER_VERSION,
+            data_version=boundary_store.data_version(),
+            risk_version=risk_data.get_provider().version(),
+            vector_tiles=vector_tiles.ENABLED,
+            tile_proxy=tile_proxy.ENABLED,
+            geojson_precision=geojson_encoding.PRECISION,
+        )
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _path(self, kind, key):
+        return os.path.join(self.cache_dir, kind, f"{key}.gz")
+
+    def _disk_index(self):
+        # LRU order of the disk tier, rebuilt from the access times left by earlier
+        # runs on first use or when cache_dir changes; call with the lock held
+        if self._disk_root != self.cache_dir:
+            self._disk_root = self.cache_dir
+            self._disk = OrderedDict()
+            self.disk_bytes = 0
+            found = []
+            for dirpath, _, filenames in os.walk(self.cache_dir):
+                for filename in filenames:
+                    if not filename.endswith('.gz'):
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    stat = os.stat(path)
+                    if time.time() - stat.st_mtime > self.max_age:
+                        _remove_file(path)
+                        continue
+                    found.append((stat.st_atime, path, stat.st_size))
+            for _, path, size in sorted(found):
+                self._disk[path] = size
+                self.disk_bytes += size
+        return self._disk
+
+    def _forget(self, path):
+        with self._lock:
+            self.disk_bytes -= self._disk_index().pop(path, 0)
+        _remove_file(path)
+
+    def _read_disk(self, path):
+        """Payload stored at ``path``, None if there is none or it is older than ``max_age``."""
+        with self._lock:
+            index = self._disk_index()
+            if path not in index:
+                return None
+            index.move_to_end(path)
+        try:
+            stat = os.stat(path)
+            if time.time() - stat.st_mtime > self.max_age:
+                self._forget(path)
+                return None
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                value = f.read()
+            # Access time orders the LRU across restarts, the modification time is the age
+            os.utime(path, (time.time(), stat.st_mtime))
+            return value
+        except FileNotFoundError:
+            # Evicted between the lookup and the read
+            return None
+
+    def _write_disk(self, path, value):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+        evicted = []
+        with self._lock:
+            index = self._disk_index()
+            self.disk_bytes += size - index.pop(path, 0)
+            index[path] = size
+            while self.disk_bytes > self.disk_max_bytes and len(index) > 1:
+                old_path, old_size = index.popitem(last=False)
+                self.disk_bytes -= old_size
+                self.disk_evictions += 1
+                evicted.append(old_path)
+        for old_path in evicted:
+            _remove_file(old_path)
+
+    def get_or_render(self, kind, render, **params):
+        """Cached string for ``kind`` and ``params``, calling ``render()`` on a miss in both tiers."""
+        key = self.key(kind, **params)
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+
+        path = self._path(kind, key)
+        value = self._read_disk(path)
+        if value is not None:
+            with self._lock:
+                self.disk_hits += 1
+            return self.memory.put(key, value)
+
+        start = time.perf_counter()
+        value = render()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.renders += 1
+            self.latencies.append(elapsed)
+
+        self._write_disk(path, value)
+        return self.memory.put(key, value)
+
+    def stats(self):
+        memory = self.memory.stats()
+        with self._lock:
+            latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+            lookups = memory['hits'] + memory['misses']
+            return {
+                'lookups': lookups,
+                'memory_hits': memory['hits'],
+                'disk_hits': self.disk_hits,
+                'renders': self.renders,
+                'hit_rate': (memory['hits'] + self.disk_hits) / lookups if lookups else 0.0,
+                'memory_bytes': memory['bytes'],
+                'disk_bytes': self.disk_bytes,
+                'disk_evictions': self.disk_evictions,
+                'render_ms_mean': float(latencies.mean() * 1000),
+                'render_ms_p50': float(np.percentile(latencies, 50) * 1000),
+                'render_ms_p95': float(np.percentile(latencies, 95) * 1000),
+            }
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache():
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = RenderCache(int(MAX_MB * 1024 * 1024), CACHE_DIR)
+        return _shared
+
+
+def stats():
+    return shared_cache().stats()
+
+
+def warm(years=None, zoom=None):
+    """Prerender every sidebar combination into both cache tiers.
+
+    Renders what ``map_engine.show_map`` reads: the map page for view types
+    served as vector tiles, the incremental map's geometry payload otherwise.
+    """
+    import incremental_map
+    import map_engine
+
+    years = years or risk_data.available_years()
+    zoom = zoom or map_engine.ZOOM_START
+    for view_type in map_engine.VIEW_TYPES:
+        if not vector_tiles.serves(view_type):
+            # One payload per view, the scores go to the browser separately
+            incremental_map.geometry_payload(view_type, zoom)
+            continue
+        for risk_type in map_engine.RISK_TYPES:
+            for year in years:
+                map_engine.render_html(view_type, risk_type, year, zoom)
+    return stats()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    warm_parser = subparsers.add_parser('warm', help='Prerender every view/risk/year combination')
+    warm_parser.add_argument('--years', type=int, nargs='+', default=None,
+                             help='Years to prerender (default: every year with risk data)')
+    warm_parser.add_argument('--zoom', type=int, default=None)
+
+    args = parser.parse_args(argv)
+    if args.command == 'warm':
+        json.dump(warm(args.years, args.zoom), sys.stdout, indent=2)
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
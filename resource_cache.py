@@ -0,0 +1,176 @@
+"""Process-wide cache for the boundary layers and risk tables.
+
+Streamlit runs every session as a thread in the same server process, so a
+module-level cache is shared by all sessions: each layer is loaded once and
+every session gets the same object. Cached frames are shared, treat them as
+read-only. Entries are evicted least-recently-used first once the total
+estimated size goes over the memory budget (``RESOURCE_CACHE_MAX_MB``).
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_MB = float(os.environ.get('RESOURCE_CACHE_MAX_MB', '512'))
+
+# Rough per-coordinate cost of a shapely geometry (two float64s)
+_BYTES_PER_COORD = 16
+
+
+def estimate_nbytes(value):
+    """Best-effort in-memory size of a cached value in bytes.
+
+    Other types can report their own size with an ``nbytes`` attribute.
+    """
+    if isinstance(value, pd.DataFrame):
+        nbytes = int(value.memory_usage(index=True, deep=True).sum())
+        geometry = getattr(value, 'geometry', None) if hasattr(value, 'set_geometry') else None
+        if geometry is not None:
+            import shapely
+            nbytes += int(shapely.get_num_coordinates(np.asarray(geometry.values)).sum()) * _BYTES_PER_COORD
+        return nbytes
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            # nbytes only counts the pointers, not the strings they point to
+            return int(pd.Series(value.ravel(), copy=False).memory_usage(index=False, deep=True))
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(k) + estimate_nbytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(item) for item in value)
+    nbytes = getattr(value, 'nbytes', None)
+    if nbytes is not None:
+        return int(nbytes)
+    return sys.getsizeof(value)
+
+
+class ResourceCache:
+    """Thread-safe LRU cache with a memory budget and hit/miss counters."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.RLock()
+        self._key_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def current_bytes(self):
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        size = estimate_nbytes(value)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            self._evict()
+        return value
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for ``key``, calling ``loader()`` once on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            # [lock, callers holding or waiting on it]
+            key_lock = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            key_lock[1] += 1
+
+        # Concurrent sessions asking for the same key wait for one load
+        try:
+            with key_lock[0]:
+                with self._lock:
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        return self._entries[key]
+                    self.misses += 1
+                value = loader()
+                self.put(key, value)
+                return value
+        finally:
+            # The last caller out drops the lock, also when loader() raised; dropping it
+            # while others still wait would let a new caller load the same key alongside them
+            with self._lock:
+                key_lock[1] -= 1
+                if not key_lock[1]:
+                    del self._key_locks[key]
+
+    def evict(self, key):
+        with self._lock:
+            if key in self._entries:
+                del self._entries[key]
+                del self._sizes[key]
+                self.evictions += 1
+                return True
+            return False
+
+    def clear(self):
+        with self._lock:
+            self.evictions += len(self._entries)
+            self._entries.clear()
+            self._sizes.clear()
+
+    def _evict(self):
+        # Always keep the most recent entry, even if it alone is over budget
+        while len(self._entries) > 1 and sum(self._sizes.values()) > self.max_bytes:
+            key, _ = self._entries.popitem(last=False)
+            del self._sizes[key]
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': sum(self._sizes.values()),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache():
+    """The single cache instance shared by every session in this process."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResourceCache(int(DEFAULT_MAX_MB * 1024 * 1024))
+        return _shared_cache
+
+
+def configure(max_mb):
+    """Change the memory budget of the shared cache, evicting if needed."""
+    cache = shared_cache()
+    with cache._lock:
+        cache.max_bytes = int(max_mb * 1024 * 1024)
+        cache._evict()
+    return cache
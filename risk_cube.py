@@ -0,0 +1,220 @@
+"""Pre-aggregated year x geography x peril risk cube.
+
+Aggregating raw policies on every sidebar click does not scale, so the mean
+scores are computed offline into one float32 array per view type with shape
+``(years, geographies, perils)``. Arrays are stored as ``.npy`` files and
+memory-mapped on load; any year / view type / peril selection is then a
+slice of an existing array. Geographies are the sorted integer FIPS keys.
+
+    python risk_cube.py build --out data/cube
+    python risk_cube.py append --out data/cube --year 2024
+
+Set ``RISK_CUBE_PATH`` to serve the maps from a cube. The cube is built from
+the policy provider configured in risk_data.py.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+import risk_data
+
+PERILS = ['Earthquake', 'Flood']
+SCORE_COLUMNS = ['Earthquake_Risk_Score', 'Flood_Risk_Score']
+
+MANIFEST_NAME = 'cube.json'
+
+
+class RiskCube:
+
+    def __init__(self, years, keys, values):
+        # years: sorted int array; keys/values: view type -> sorted int64 keys / (year, geo, peril) array
+        self.years = np.asarray(years, dtype=np.int64)
+        self.keys = keys
+        self.values = values
+
+    @property
+    def nbytes(self):
+        """Size of the cube arrays, memory-mapped ones included, for the resource cache budget."""
+        return self.years.nbytes + sum(self.keys[v].nbytes + self.values[v].nbytes for v in self.values)
+
+    def year_index(self, year):
+        idx = int(np.searchsorted(self.years, year))
+        if idx == len(self.years) or self.years[idx] != year:
+            raise KeyError(f"Year {year} is not in the risk cube")
+        return idx
+
+    def slice(self, view_type, year, risk_type):
+        """Scores of one peril in one year for every geography, as a view into the cube."""
+        return self.values[view_type][self.year_index(year), :, PERILS.index(risk_type)]
+
+    def risk_table(self, view_type, year=None):
+        """Risk table (``geoid_key`` + score columns) for ``view_type`` in ``year``, all years if None."""
+        values = self.values[view_type]
+        if year is None:
+            scores = np.nanmean(values, axis=0)
+        elif int(year) in self.years:
+            scores = values[self.year_index(year)]
+        else:
+            # A year the cube does not cover shows as missing data rather than failing the page
+            scores = np.full(values.shape[1:], np.nan, dtype=values.dtype)
+        table = pd.DataFrame(scores, columns=SCORE_COLUMNS)
+        table.insert(0, 'geoid_key', self.keys[view_type])
+        return table
+
+    def version(self):
+        """Content hash of the cube, so caches keyed on it follow rebuilds and appends."""
+        digest = hashlib.sha256(self.years.tobytes())
+        for view_type in sorted(self.values):
+            digest.update(np.ascontiguousarray(self.keys[view_type]).tobytes())
+            digest.update(np.ascontiguousarray(self.values[view_type]).tobytes())
+        return 'cube-' + digest.hexdigest()[:12]
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for view_type in self.values:
+            np.save(os.path.join(path, f"{view_type}_keys.npy"), self.keys[view_type])
+            tmp_path = os.path.join(path, f"{view_type}_values.tmp.npy")
+            np.save(tmp_path, np.ascontiguousarray(self.values[view_type]))
+            os.replace(tmp_path, os.path.join(path, f"{view_type}_values.npy"))
+        manifest = {'years': self.years.tolist(), 'view_types': sorted(self.values), 'perils': PERILS}
+        with open(os.path.join(path, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        with open(os.path.join(path, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        keys = {}
+        values = {}
+        for view_type in manifest['view_types']:
+            keys[view_type] = np.load(os.path.join(path, f"{view_type}_keys.npy"))
+            values[view_type] = np.load(os.path.join(path, f"{view_type}_values.npy"), mmap_mode=mmap_mode)
+        return cls(manifest['years'], keys, values)
+
+
+def _align(scores, keys):
+    """(geo, peril) block of ``scores`` laid out along the sorted ``keys``, NaN where missing."""
+    score_keys = scores['geoid_key'].to_numpy(dtype=np.int64)
+    block = np.full((len(keys), len(PERILS)), np.nan, dtype=np.float32)
+    positions = np.searchsorted(keys, score_keys)
+    found = (positions < len(keys)) & (keys[np.minimum(positions, len(keys) - 1)] == score_keys)
+    block[positions[found]] = scores[SCORE_COLUMNS].to_numpy(dtype=np.float32)[found]
+    return block
+
+
+def build_cube(provider, years=None):
+    """Aggregate ``provider`` into a cube covering ``years`` (default: risk_data.YEARS)."""
+    years = sorted(years or risk_data.YEARS)
+    keys = {}
+    values = {}
+    for view_type in risk_data.GEO_KEY_COLUMNS:
+        per_year = [provider.risk_scores(view_type, year=year) for year in years]
+        # Union of keys over all years so geographies missing in one year are NaN there
+        keys[view_type] = np.unique(np.concatenate(
+            [scores['geoid_key'].to_numpy(dtype=np.int64) for scores in per_year]))
+        values[view_type] = np.stack([_align(scores, keys[view_type]) for scores in per_year])
+    return RiskCube(years, keys, values)
+
+
+def append_year(cube, provider, year):
+    """New cube with ``year`` added (or replaced), aggregating only that year."""
+    years = cube.years.tolist()
+    keys = {}
+    values = {}
+    for view_type, old_keys in cube.keys.items():
+        scores = provider.risk_scores(view_type, year=year)
+        new_keys = np.union1d(old_keys, scores['geoid_key'].to_numpy(dtype=np.int64))
+        old_values = np.array(cube.values[view_type])
+        # Re-align the existing years if the new year brings new geographies
+        if len(new_keys) != len(old_keys):
+            aligned = np.full((len(years), len(new_keys), len(PERILS)), np.nan, dtype=np.float32)
+            aligned[:, np.searchsorted(new_keys, old_keys)] = old_values
+            old_values = aligned
+        block = _align(scores, new_keys)
+        if year in years:
+            old_values[years.index(year)] = block
+            values[view_type] = old_values
+        else:
+            position = int(np.searchsorted(cube.years, year))
+            values[view_type] = np.insert(old_values, position, block, axis=0)
+        keys[view_type] = new_keys
+    return RiskCube(sorted(set(years) | {year}), keys, values)
+
+
+class CubeRiskProvider(risk_data.RiskDataProvider):
+    """Serves risk tables by slicing a prebuilt cube instead of scanning policies.
+
+    The cube is reloaded when its manifest changes on disk, so a ``build`` or
+    ``append`` shows up without restarting the app.
+    """
+
+    has_policies = False
+
+    def __init__(self, path):
+        self.path = path
+        self._stamp = None
+        self._lock = threading.Lock()
+        self._refresh()
+
+    def _refresh(self):
+        # The manifest is written last by RiskCube.save
+        stat = os.stat(os.path.join(self.path, MANIFEST_NAME))
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if stamp != self._stamp:
+                self.cube = RiskCube.load(self.path)
+                self._version = self.cube.version()
+                self._stamp = stamp
+            return self.cube
+
+    def years(self):
+        return self._refresh().years.tolist()
+
+    def risk_scores(self, view_type, year=None, region=None):
+        table = self._refresh().risk_table(view_type, year)
+        if region is not None:
+            state_keys = table['geoid_key'] // 1000 if view_type == 'County' else table['geoid_key']
+            table = table[state_keys.isin([int(code) for code in region])]
+        return table
+
+    def read_policies(self, year=None, region=None, columns=None):
+        raise NotImplementedError("A risk cube holds aggregates, not policy rows")
+
+    def version(self):
+        self._refresh()
+        return self._version
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help='Build a cube from the configured risk data provider')
+    build.add_argument('--out', required=True, help='Cube directory')
+    build.add_argument('--years', type=int, nargs='+', default=risk_data.YEARS)
+
+    append = subparsers.add_parser('append', help='Add or refresh one year in an existing cube')
+    append.add_argument('--out', required=True, help='Cube directory')
+    append.add_argument('--year', type=int, required=True)
+
+    args = parser.parse_args(argv)
+    # Always aggregate from policies, never from a cube configured via RISK_CUBE_PATH
+    provider = risk_data.policy_provider()
+    if args.command == 'build':
+        cube = build_cube(provider, args.years)
+    else:
+        cube = append_year(RiskCube.load(args.out, mmap_mode=None), provider, args.year)
+    cube.save(args.out)
+    shapes = ', '.join(f"{view} {values.shape}" for view, values in cube.values.items())
+    print(f"years {cube.years.tolist()}: {shapes} -> {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,292 @@
+"""Risk data providers for the maps.
+
+A provider reads policy-level earthquake and flood scores and aggregates them
+to the state or county FIPS key the map joins on. Policy rows share one
+schema whatever the backing store:
+
+    year        int16    policy year
+    state_key   int64    state FIPS code
+    county_key  int64    county FIPS code (STATEFP + COUNTYFP)
+    earthquake_score, flood_score   float32, 1-10
+    customer_id int64    policyholder
+    premium, claims, expenses       float64, written premium, paid claims
+                                    and expenses in $ (for kpi_engine.py)
+
+``ParquetRiskProvider`` reads a hive-partitioned Parquet dataset
+(``year=2021/part-0.parquet``) and pushes the year and region filters down
+to the scan, so only the matching partitions and row groups are read.
+``SyntheticRiskProvider`` generates the same rows in memory for tests and
+demos. Point ``RISK_DATA_PATH`` at a dataset to use real data (or
+``RISK_CUBE_PATH`` at a cube built from it, see risk_cube.py, or
+``RISK_POINTS_PATH`` at geocoded points, see point_aggregation.py), or
+build a synthetic one with:
+
+    python risk_data.py synth --out data/risk --policies-per-county 100
+"""
+import argparse
+import hashlib
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+import boundary_store
+
+RISK_DATA_PATH = os.environ.get('RISK_DATA_PATH')
+# Geocoded policy points (see point_aggregation.py), preferred over RISK_DATA_PATH when set
+RISK_POINTS_PATH = os.environ.get('RISK_POINTS_PATH')
+# Pre-aggregated cube (see risk_cube.py), preferred over raw policies when set
+RISK_CUBE_PATH = os.environ.get('RISK_CUBE_PATH')
+
+YEARS = [2020, 2021, 2022, 2023]
+
+SCORE_COLUMNS = {
+    'Earthquake_Risk_Score': 'earthquake_score',
+    'Flood_Risk_Score': 'flood_score',
+}
+
+# Policy column holding the FIPS key for each view type
+GEO_KEY_COLUMNS = {
+    'State': 'state_key',
+    'County': 'county_key',
+}
+
+
+class RiskDataProvider:
+    """Base provider: subclasses implement ``read_policies`` and ``version``."""
+
+    # False for providers serving aggregates only
+    has_policies = True
+
+    def years(self):
+        """Sorted years the provider has data for."""
+        years = self.read_policies(columns=['year'])['year']
+        return sorted(int(year) for year in pd.unique(years))
+
+    def read_policies(self, year=None, region=None, columns=None):
+        """Policy rows for ``year`` and ``region`` (a list of state FIPS codes), or all of them."""
+        raise NotImplementedError
+
+    def iter_policies(self, year=None, region=None, columns=None, batch_rows=1_000_000):
+        """Policy rows as DataFrames of at most ``batch_rows`` rows, for aggregations larger than RAM."""
+        policies = self.read_policies(year, region, columns)
+        for start in range(0, len(policies), batch_rows):
+            yield policies.iloc[start:start + batch_rows]
+
+    def version(self):
+        """Short string that changes whenever the underlying data changes."""
+        raise NotImplementedError
+
+    def risk_scores(self, view_type, year=None, region=None):
+        """Mean risk scores per geography, keyed by ``geoid_key`` for risk_layers.join_risk."""
+        key_column = GEO_KEY_COLUMNS[view_type]
+        policies = self.read_policies(year, region, columns=[key_column] + list(SCORE_COLUMNS.values()))
+        scores = policies.groupby(key_column, sort=True)[list(SCORE_COLUMNS.values())].mean()
+        scores = scores.rename(columns={v: k for k, v in SCORE_COLUMNS.items()})
+        scores.index = scores.index.astype(np.int64)
+        return scores.rename_axis('geoid_key').reset_index()
+
+
+class ParquetRiskProvider(RiskDataProvider):
+    """Reads policies from a (hive-partitioned) Parquet dataset with filter pushdown."""
+
+    def __init__(self, path):
+        import pyarrow.dataset as ds
+
+        self.path = path
+        self.dataset = ds.dataset(path, format='parquet', partitioning='hive')
+
+    def read_policies(self, year=None, region=None, columns=None):
+        table = self.dataset.to_table(columns=columns, filter=self._predicate(year, region))
+        return table.to_pandas()
+
+    def iter_policies(self, year=None, region=None, columns=None, batch_rows=1_000_000):
+        # Streams record batches off the scan, only one batch is held in memory at a time
+        for batch in self.dataset.to_batches(columns=columns, filter=self._predicate(year, region),
+                                             batch_size=batch_rows):
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+    def years(self):
+        import pyarrow.dataset as ds
+
+        # The year is a hive partition, so no rows need to be read
+        years = set()
+        for fragment in self.dataset.get_fragments():
+            year = ds.get_partition_keys(fragment.partition_expression).get('year')
+            if year is None:
+                return super().years()
+            years.add(int(year))
+        return sorted(years)
+
+    def _predicate(self, year, region):
+        import pyarrow.dataset as ds
+
+        predicate = None
+        if year is not None:
+            predicate = ds.field('year') == int(year)
+        if region is not None:
+            region_filter = ds.field('state_key').isin([int(code) for code in region])
+            predicate = region_filter if predicate is None else predicate & region_filter
+        return predicate
+
+    def version(self):
+        digest = hashlib.sha256()
+        for fragment_path in sorted(self.dataset.files):
+            stat = os.stat(fragment_path)
+            digest.update(f"{fragment_path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        return 'parquet-' + digest.hexdigest()[:12]
+
+
+class SyntheticRiskProvider(RiskDataProvider):
+    """Deterministic random policies over the county boundaries, for tests and demos."""
+
+    def __init__(self, policies_per_county=1, years=YEARS, seed=42):
+        self.policies_per_county = policies_per_county
+        self._years = list(years)
+        self.seed = seed
+        self._policies = None
+        self._lock = threading.Lock()
+
+    def policies(self):
+        with self._lock:
+            if self._policies is None:
+                counties = boundary_store.load_attributes('county', ['GEOID'])
+                self._policies = synthetic_policies(
+                    counties['GEOID'], self._years, self.policies_per_county, self.seed)
+            return self._policies
+
+    def years(self):
+        return sorted(self._years)
+
+    def read_policies(self, year=None, region=None, columns=None):
+        policies = self.policies()
+        mask = np.ones(len(policies), dtype=bool)
+        if year is not None:
+            mask &= policies['year'].to_numpy() == int(year)
+        if region is not None:
+            mask &= np.isin(policies['state_key'].to_numpy(), [int(code) for code in region])
+        selected = policies[mask]
+        return selected[columns] if columns else selected
+
+    def version(self):
+        return f"synthetic-{self.seed}-{self.policies_per_county}-{boundary_store.data_version()}"
+
+
+def synthetic_policies(county_geoids, years=YEARS, policies_per_county=1, seed=42):
+    """Random policy rows (1-10 scores) for every county in ``county_geoids`` and year.
+
+    The same policyholders renew every year; financials come from their own
+    random stream so the scores match datasets written before they existed.
+    """
+    rng = np.random.RandomState(seed)
+    money_rng = np.random.RandomState(seed + 1)
+    county_key = pd.to_numeric(pd.Series(county_geoids)).to_numpy(dtype=np.int64)
+    county_key = np.repeat(county_key, policies_per_county)
+    customer_id = np.arange(len(county_key), dtype=np.int64)
+    frames = []
+    for year in years:
+        frames.append(pd.DataFrame({
+            'year': np.full(len(county_key), year, dtype=np.int16),
+            'state_key': county_key // 1000,
+            'county_key': county_key,
+            'earthquake_score': rng.randint(1, 11, size=len(county_key)).astype(np.float32),
+            'flood_score': rng.randint(1, 11, size=len(county_key)).astype(np.float32),
+            'customer_id': customer_id,
+            **synthetic_financials(money_rng, len(county_key)),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def synthetic_financials(rng, n):
+    """Random premium, claims and expenses columns for ``n`` policies."""
+    premium = rng.lognormal(7, 0.5, size=n).round(2)
+    # About one policy in ten has a claim
+    claimed = rng.random_sample(n) < 0.1
+    claims = np.where(claimed, premium * rng.gamma(2.0, 3.0, size=n), 0.0).round(2)
+    return {
+        'premium': premium,
+        'claims': claims,
+        'expenses': (premium * rng.uniform(0.2, 0.3, size=n)).round(2),
+    }
+
+
+def write_dataset(policies, path):
+    """Write policy rows as a Parquet dataset partitioned by year."""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    table = pa.Table.from_pandas(policies, preserve_index=False)
+    ds.write_dataset(table, path, format='parquet', partitioning=['year'],
+                     partitioning_flavor='hive', existing_data_behavior='delete_matching')
+
+
+_provider = None
+_provider_lock = threading.Lock()
+_policy_provider = None
+_policy_provider_lock = threading.Lock()
+
+
+def policy_provider():
+    """Shared provider over policy rows: points, Parquet or synthetic, depending on what is configured."""
+    global _policy_provider
+    with _policy_provider_lock:
+        if _policy_provider is None:
+            if RISK_POINTS_PATH:
+                import point_aggregation
+                _policy_provider = point_aggregation.PointRiskProvider(RISK_POINTS_PATH)
+            elif RISK_DATA_PATH:
+                _policy_provider = ParquetRiskProvider(RISK_DATA_PATH)
+            else:
+                _policy_provider = SyntheticRiskProvider()
+        return _policy_provider
+
+
+def get_provider():
+    """The process-wide provider: the risk cube if RISK_CUBE_PATH is set, else policy_provider()."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            if RISK_CUBE_PATH:
+                import risk_cube
+                _provider = risk_cube.CubeRiskProvider(RISK_CUBE_PATH)
+            else:
+                _provider = policy_provider()
+        return _provider
+
+
+def available_years():
+    """Years the maps have risk data for, for the Year selectboxes."""
+    return get_provider().years()
+
+
+def set_provider(provider):
+    """Swap the process-wide provider, e.g. for a test stand-in."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    synth = subparsers.add_parser('synth', help='Write a synthetic policy dataset')
+    synth.add_argument('--out', required=True, help='Dataset directory')
+    synth.add_argument('--years', type=int, nargs='+', default=YEARS)
+    synth.add_argument('--policies-per-county', type=int, default=100)
+    synth.add_argument('--seed', type=int, default=42)
+
+    args = parser.parse_args(argv)
+    if args.command == 'synth':
+        counties = boundary_store.load_attributes('county', ['GEOID'])
+        policies = synthetic_policies(counties['GEOID'], args.years, args.policies_per_county, args.seed)
+        write_dataset(policies, args.out)
+        print(f"{len(policies):,} policies -> {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
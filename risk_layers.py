@@ -0,0 +1,164 @@
+"""Per-layer risk data pipeline for the choropleth maps.
+
+Only the layer for the selected view type is loaded and merged, so the
+State view never touches the county geometry and vice versa. Boundaries,
+risk tables and merged layers are kept in the process-wide resource cache
+so concurrent sessions share one copy of each.
+"""
+import numpy as np
+import pandas as pd
+
+import boundary_store
+import hex_grid
+import resource_cache
+import risk_data
+import simplification
+import tracing
+
+# View type shown in the sidebar -> boundary store layer
+VIEW_LAYERS = {
+    'State': 'state',
+    'County': 'county',
+}
+HEX_VIEW = 'Hex'
+# The Hex view bins the county scores into a hexagonal grid (see hex_grid.py)
+VIEW_TYPES = list(VIEW_LAYERS) + [HEX_VIEW]
+
+RISK_COLUMNS = {
+    'Earthquake': 'Earthquake_Risk_Score',
+    'Flood': 'Flood_Risk_Score',
+}
+
+# Choropleth classes and their ColorBrewer RdYlGn_r colours: green for low risk, red for high
+RISK_THRESHOLDS = [0, 1, 3, 5, 7, 10]
+RISK_PALETTE = ['#1a9641', '#a6d96a', '#ffffbf', '#fdae61', '#d7191c']
+NAN_COLOR = '#ffffff'
+
+
+def risk_classes(values):
+    """Threshold class (0-4) of each risk score in one vectorized pass, -1 for missing."""
+    values = np.asarray(values, dtype=float)
+    classes = np.digitize(values, RISK_THRESHOLDS[1:-1])
+    classes[np.isnan(values)] = -1
+    return classes
+
+
+def class_colors(classes):
+    """Fill colour of each risk class."""
+    palette = np.array(RISK_PALETTE + [NAN_COLOR], dtype=object)
+    # Class -1 indexes the trailing NaN colour
+    return palette[classes]
+
+
+def risk_colors(values):
+    """Fill colour of each risk score, same classing as the choropleth legend."""
+    return class_colors(risk_classes(values))
+
+
+class RiskJoinError(ValueError):
+    pass
+
+
+def geoid_keys(frame):
+    """Integer FIPS key of each row: STATEFP for states, STATEFP + COUNTYFP for counties.
+
+    Names are not unique ("Washington" is a county in about 30 states), so
+    joins go through these codes instead.
+    """
+    if 'GEOID' in frame.columns:
+        codes = frame['GEOID']
+    else:
+        codes = frame['STATEFP'] + frame['COUNTYFP'] if 'COUNTYFP' in frame.columns else frame['STATEFP']
+    return pd.Series(pd.to_numeric(codes).to_numpy(dtype=np.int64), index=frame.index, name='geoid_key')
+
+
+def join_risk(boundaries, risk_table):
+    """Left-join ``risk_table`` onto ``boundaries`` by integer FIPS key, strictly one-to-one.
+
+    Raises RiskJoinError if either side has duplicate keys, so the output
+    always has exactly one row per input geometry.
+    """
+    keyed = boundaries.assign(geoid_key=geoid_keys(boundaries))
+    try:
+        layer_risk = keyed.merge(risk_table, on='geoid_key', how='left', validate='one_to_one')
+    except pd.errors.MergeError as e:
+        raise RiskJoinError(f"Risk join is not one-to-one on FIPS codes: {e}") from e
+    if len(layer_risk) != len(boundaries):
+        raise RiskJoinError(f"Risk join returned {len(layer_risk)} rows for {len(boundaries)} geometries")
+    return layer_risk
+
+
+def layer_tier(view_type, zoom=None):
+    """Geometry level drawn at ``zoom``: a simplification tier, or a grid resolution for the Hex view."""
+    if view_type == HEX_VIEW:
+        return hex_grid.resolution_for_zoom(zoom)
+    return simplification.tier_for_zoom(zoom) if zoom is not None else 'full'
+
+
+def load_boundaries(view_type, tier=None):
+    """Boundary GeoDataFrame for ``view_type`` at simplification ``tier``, shared across sessions.
+
+    For the Hex view ``tier`` is the grid resolution (the finest by default).
+    """
+    if view_type == HEX_VIEW:
+        resolution = hex_grid.resolution_for_zoom(None) if tier is None else tier
+        key = ('boundaries', 'hex', resolution, boundary_store.data_version())
+        return resource_cache.shared_cache().get_or_load(key, lambda: _load_hex_grid(resolution))
+    if view_type not in VIEW_LAYERS:
+        raise ValueError(f"Unknown view type: {view_type!r}")
+    layer = VIEW_LAYERS[view_type]
+    key = ('boundaries', layer, tier or 'full', boundary_store.data_version())
+    return resource_cache.shared_cache().get_or_load(key, lambda: _load_boundaries(layer, tier))
+
+
+def _load_boundaries(layer, tier):
+    with tracing.span('load', layer=layer, tier=tier or 'full'):
+        return boundary_store.load_layer(layer, tier=tier)
+
+
+def _load_hex_grid(resolution):
+    with tracing.span('load', layer='hex', tier=resolution):
+        return hex_grid.load_hex_layer(resolution)
+
+
+def load_risk_table(view_type, year=None):
+    """Risk scores for ``view_type`` in ``year`` from the risk data provider, shared across sessions."""
+    provider = risk_data.get_provider()
+    key = ('risk_table', view_type, year, provider.version())
+    return resource_cache.shared_cache().get_or_load(key, lambda: _load_risk_table(provider, view_type, year))
+
+
+def _load_risk_table(provider, view_type, year):
+    with tracing.span('risk_scores', view_type=view_type, year=year):
+        return provider.risk_scores(view_type, year=year)
+
+
+def load_risk_layer(view_type, fill_missing=False, zoom=None, year=None):
+    """Boundaries for ``view_type`` with the ``year`` risk scores merged on, shared across sessions.
+
+    With ``zoom`` the geometry comes from the simplification tier (or hex grid
+    resolution) for that zoom level.
+    """
+    tier = layer_tier(view_type, zoom)
+    key = ('risk_layer', view_type, tier, year, fill_missing,
+           boundary_store.data_version(), risk_data.get_provider().version())
+    return resource_cache.shared_cache().get_or_load(
+        key, lambda: _merge_risk_layer(view_type, tier, year, fill_missing))
+
+
+def _merge_risk_layer(view_type, tier, year, fill_missing):
+    boundaries = load_boundaries(view_type, tier)
+    if view_type == HEX_VIEW:
+        county_table = load_risk_table('County', year)
+        with tracing.span('bin', resolution=tier, rows=len(boundaries)):
+            risk_table = hex_grid.hex_risk_table(boundaries, county_table, list(RISK_COLUMNS.values()))
+        boundaries = boundaries.drop(columns=hex_grid.SAMPLE_COLUMNS)
+    else:
+        risk_table = load_risk_table(view_type, year)
+    with tracing.span('merge', view_type=view_type, rows=len(boundaries)):
+        layer_risk = join_risk(boundaries, risk_table)
+
+    if fill_missing:
+        for column in RISK_COLUMNS.values():
+            layer_risk[column] = layer_risk[column].fillna(0)
+    return layer_risk
@@ -0,0 +1,69 @@
+"""Precomputed, topology-preserving simplification tiers for the boundary layers.
+
+Neighbouring states and counties share edges, so simplifying each polygon on
+its own opens gaps and overlaps between them. Tiers are built with
+``shapely.coverage_simplify`` (shapely >= 2.1), which simplifies every shared
+edge once for the whole coverage. On older shapely the per-polygon
+``simplify(preserve_topology=True)`` is used instead.
+
+Tolerances are in degrees (the Census layers are EPSG:4269) and sit below
+the size of a screen pixel at the zoom levels each tier is used for.
+"""
+import geopandas as gpd
+import numpy as np
+import shapely
+
+import boundary_store
+
+# tier -> (tolerance in degrees, highest zoom level it is used for)
+TIERS = {
+    'coarse': (0.05, 4),
+    'medium': (0.01, 6),
+    'fine': (0.0025, 8),
+}
+
+
+def tier_for_zoom(zoom):
+    """Coarsest tier that still looks right at ``zoom``, 'full' past the finest one."""
+    for tier, (_, max_zoom) in TIERS.items():
+        if zoom <= max_zoom:
+            return tier
+    return 'full'
+
+
+def tier_layer_name(layer, tier):
+    return f"{layer}@{tier}"
+
+
+def simplify_geometry(geometry, tolerance):
+    """Simplify a GeoSeries, keeping shared edges between neighbours intact."""
+    geoms = np.asarray(geometry.values)
+    if hasattr(shapely, 'coverage_simplify'):
+        simplified = shapely.coverage_simplify(geoms, tolerance, simplify_boundary=True)
+    else:
+        simplified = shapely.simplify(geoms, tolerance, preserve_topology=True)
+    return gpd.GeoSeries(simplified, index=geometry.index, crs=geometry.crs)
+
+
+def tier_is_current(layer, tier, store_dir=None):
+    """True if the stored tier was built from the layer currently in the store."""
+    name = tier_layer_name(layer, tier)
+    if not boundary_store.has_layer(name, store_dir):
+        return False
+    layers = boundary_store.read_manifest(store_dir)['layers']
+    base = layers.get(layer, {})
+    return layers[name].get('base_imported_at') == base.get('imported_at')
+
+
+def build_tier(layer, tier, store_dir=None):
+    """Simplify ``layer`` at ``tier`` and write it to the boundary store."""
+    tolerance, _ = TIERS[tier]
+    gdf = boundary_store.load_layer(layer, store_dir=store_dir)
+    simplified = gdf.set_geometry(simplify_geometry(gdf.geometry, tolerance))
+    base = boundary_store.read_manifest(store_dir)['layers'][layer]
+    boundary_store.write_layer(simplified, tier_layer_name(layer, tier), store_dir, {
+        'base_layer': layer,
+        'base_imported_at': base['imported_at'],
+        'tolerance': tolerance,
+    })
+    return simplified
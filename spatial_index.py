@@ -0,0 +1,96 @@
+"""STRtree index over the boundary layers for click and viewport queries.
+
+``st_folium`` returns the last clicked point and the current map bounds on
+every interaction. ``layer_index(view_type)`` answers both against the
+full-resolution boundaries: which state or county contains the click, and
+which ones intersect the viewport. The index is built once per boundary
+data version and kept in the shared resource cache next to the boundaries
+(shapely trees are rebuilt on unpickling, so persisting one to disk would
+save nothing over building it from the memory-mapped layer).
+
+    index = spatial_index.layer_index('County')
+    row = index.at_point(lon, lat)         # position in the layer, or None
+    rows = index.in_bounds(west, south, east, north)
+"""
+import numpy as np
+import shapely
+
+import boundary_store
+import resource_cache
+import risk_layers
+
+# Rough cost of one STRtree entry: its envelope, pointers and share of the inner nodes
+_TREE_BYTES_PER_ITEM = 64
+
+
+class SpatialIndex:
+    """Point and bounding-box queries over one boundary layer."""
+
+    def __init__(self, boundaries):
+        self.geoids = boundaries['GEOID'].to_numpy()
+        self.keys = risk_layers.geoid_keys(boundaries).to_numpy()
+        self.names = boundaries['NAME'].to_numpy()
+        self.tree = shapely.STRtree(np.asarray(boundaries.geometry.values))
+
+    def __len__(self):
+        return len(self.geoids)
+
+    @property
+    def nbytes(self):
+        """Approximate size for the resource cache budget.
+
+        The id arrays plus the tree nodes; the geometries are shared with the cached boundaries.
+        """
+        arrays = sum(resource_cache.estimate_nbytes(a) for a in (self.geoids, self.keys, self.names))
+        return arrays + len(self.tree) * _TREE_BYTES_PER_ITEM
+
+    def at_point(self, lon, lat):
+        """Position of the feature containing (lon, lat), None outside every feature."""
+        hits = self.tree.query(shapely.Point(lon, lat), predicate='intersects')
+        return int(hits.min()) if len(hits) else None
+
+    def locate(self, lon, lat):
+        """Position of the feature containing each (lon, lat) point, -1 outside every feature.
+
+        One bulk tree query for all points; a point on a shared edge goes to
+        the lowest position, the same as ``at_point``.
+        """
+        points = shapely.points(np.asarray(lon, dtype=float), np.asarray(lat, dtype=float))
+        point_idx, feature_idx = self.tree.query(points, predicate='intersects')
+        order = np.lexsort((feature_idx, point_idx))
+        first_point, first = np.unique(point_idx[order], return_index=True)
+        positions = np.full(len(points), -1, dtype=np.int64)
+        positions[first_point] = feature_idx[order][first]
+        return positions
+
+    def in_bounds(self, west, south, east, north):
+        """Sorted positions of the features intersecting the bounding box."""
+        return np.sort(self.tree.query(shapely.box(west, south, east, north), predicate='intersects'))
+
+
+def layer_index(view_type, zoom=None):
+    """SpatialIndex of the full-resolution ``view_type`` boundaries, shared across sessions.
+
+    The Hex view has no full resolution, its index covers the grid drawn at ``zoom``.
+    """
+    tier = risk_layers.layer_tier(view_type, zoom) if view_type == risk_layers.HEX_VIEW else None
+    key = ('spatial_index', view_type, tier, boundary_store.data_version())
+    return resource_cache.shared_cache().get_or_load(
+        key, lambda: SpatialIndex(risk_layers.load_boundaries(view_type, tier)))
+
+
+def clicked_point(map_state):
+    """(lon, lat) of the last click in an ``st_folium`` return value, or None."""
+    clicked = (map_state or {}).get('last_clicked')
+    if not clicked:
+        return None
+    return clicked['lng'], clicked['lat']
+
+
+def viewport(map_state):
+    """(west, south, east, north) of the map bounds in an ``st_folium`` return value, or None."""
+    bounds = (map_state or {}).get('bounds')
+    if not bounds or not bounds.get('_southWest') or bounds['_southWest'].get('lat') is None:
+        return None
+    south_west, north_east = bounds['_southWest'], bounds['_northEast']
+    return south_west['lng'], south_west['lat'], north_east['lng'], north_east['lat']
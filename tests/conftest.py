@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, 'benchmarks'))
+
+
+@pytest.fixture(scope='session')
+def fixture_store(tmp_path_factory):
+    """Offline boundary store seeded with the synthetic fixture layers of benchmarks/fixtures.py."""
+    import fixtures
+
+    import boundary_store
+    import render_cache
+
+    store_dir = fixtures.seed_store(str(tmp_path_factory.mktemp('boundaries')))
+    boundary_store.STORE_DIR = store_dir
+    boundary_store.OFFLINE = True
+    # Rendered payloads must not leak in from (or out to) the real cache directory
+    render_cache.shared_cache().cache_dir = str(tmp_path_factory.mktemp('render_cache'))
+    return store_dir
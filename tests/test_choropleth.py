@@ -0,0 +1,18 @@
+import re
+from collections import Counter
+
+import pytest
+
+import map_engine
+
+
+@pytest.mark.parametrize('view_type', ['State', 'County'])
+def test_each_geometry_rendered_once(fixture_store, view_type):
+    layer = map_engine.build_layer(view_type, 2023, zoom=4)
+    html = map_engine.render_map(view_type, 'Earthquake', 2023, zoom=4).get_root().render()
+
+    # Every feature carries its GEOID once, so a second copy of a geometry shows up as a repeat
+    counts = Counter(re.findall(r'"GEOID":\s*"(\d+)"', html))
+    assert set(counts) == set(layer['GEOID'])
+    assert set(counts.values()) == {1}
+    assert len(re.findall(r'"type":\s*"Feature"', html)) == len(layer)
@@ -0,0 +1,33 @@
+import folium
+
+import choropleth
+import map_engine
+
+
+def _page_bytes(layer=None):
+    # The rest of a risk map page: basemap, legend and layer control
+    m = map_engine.base_map()
+    if layer is not None:
+        layer.add_to(m)
+    choropleth.add_legend(m, "Earthquake Risk Score")
+    folium.LayerControl().add_to(m)
+    return len(m.get_root().render().encode())
+
+
+def test_compact_payload_reaches_page(fixture_store):
+    n = len(map_engine.build_layer('County', 2023, zoom=4))
+    payload = map_engine.layer_geojson('County', 'Earthquake', 2023, zoom=4)
+    html = map_engine.render_map('County', 'Earthquake', 2023, zoom=4).get_root().render()
+    assert payload in html
+
+    empty = _page_bytes()
+    per_feature = (len(html.encode()) - empty) / n
+    # Only the constant layer script comes on top of the payload
+    assert per_feature < len(payload.encode()) / n + 2
+    # Coarse fixture counties: 5 decimals, four properties, no whitespace
+    assert per_feature < 500
+
+    # folium.GeoJson writes the same payload back out with the default separators
+    reserialized = folium.GeoJson(
+        payload, style_function=lambda feature: choropleth.FEATURE_STYLES[feature['properties']['risk_class']])
+    assert per_feature < 0.95 * (_page_bytes(reserialized) - empty) / n
@@ -0,0 +1,55 @@
+import re
+
+import folium
+import streamlit_folium
+from streamlit.testing.v1 import AppTest
+
+import incremental_map
+import map_engine
+
+
+def _county_map_app():
+    import map_engine
+
+    map_engine.show_map('County', 'Earthquake', 2023)
+
+
+def _holds_element(value):
+    items = value if isinstance(value, (tuple, list)) else [value]
+    return any(isinstance(item, folium.Element) for item in items)
+
+
+def _map_strings(risk_type, year):
+    # The same path show_risk_map takes, at the default mount view
+    m, update = incremental_map.risk_map('County', risk_type, year, 4, (map_engine.MAP_CENTER, 4))
+    # st_folium renders the map first, renaming every element to its div_N form, then the feature group
+    leaflet = streamlit_folium._get_map_string(m)
+    return leaflet, streamlit_folium._get_feature_group_string(update, m)
+
+
+def test_restyle_names_geometry_after_id_rewrite(fixture_store):
+    leaflet, feature_group = _map_strings('Flood', 2023)
+    restyled = re.findall(r'(\w+)\.eachLayer', feature_group)
+    assert restyled == [incremental_map.GEOMETRY_VAR]
+    assert f'var {incremental_map.GEOMETRY_VAR} = L.geoJson(' in leaflet
+
+
+def test_map_script_stable_across_toggles(fixture_store):
+    # The component stays mounted only if the map script, and so its hash, is the same for every toggle
+    scripts = {selection: _map_strings(*selection) for selection in
+               [('Earthquake', 2023), ('Flood', 2023), ('Earthquake', 2022)]}
+    assert len({leaflet for leaflet, _ in scripts.values()}) == 1
+    hashes = {streamlit_folium.generate_js_hash(leaflet, 'k') for leaflet, _ in scripts.values()}
+    assert len(hashes) == 1
+    # The scores do change, and only in the feature group
+    assert len({feature_group for _, feature_group in scripts.values()}) == 3
+
+
+def test_no_map_kept_in_session_state(fixture_store):
+    at = AppTest.from_function(_county_map_app, default_timeout=60)
+    at.run()
+    assert not at.exception
+    at.run()
+    assert not at.exception
+    assert not [key for key, value in at.session_state.items() if _holds_element(value)]
+
@@ -0,0 +1,64 @@
+"""Per-stage latency of the map engine on the fixture shapefiles, with pytest-benchmark.
+
+Stages are timed for each view type, with the shared caches cleared before
+every round so each number is the uncached cost of that stage:
+
+    build_layer   load boundaries (zoom-4 tier) and join the risk scores
+    style_layer   vectorized classing and colours
+    geojson       compact GeoJSON encoding of the styled layer (geojson_encoding.encode,
+                  as map_engine.layer_geojson does on a cache miss)
+    render_map    folium map construction
+    render_html   folium / Jinja rendering of the full page
+
+Save a baseline, then fail when the best round of a stage is more than 25%
+slower than it:
+
+    python -m pytest tests/test_map_engine_stages.py --benchmark-autosave
+    python -m pytest tests/test_map_engine_stages.py --benchmark-compare --benchmark-compare-fail=min:25%
+
+The rest of the suite runs without the stages with --benchmark-skip.
+"""
+import os
+
+import pytest
+
+import choropleth
+import geojson_encoding
+import map_engine
+import render_cache
+import resource_cache
+import risk_layers
+
+pytest.importorskip('pytest_benchmark')
+
+ROUNDS = int(os.environ.get('BENCH_ROUNDS', '5'))
+STAGES = ['build_layer', 'style_layer', 'geojson', 'render_map', 'render_html']
+
+
+def _stages(view_type):
+    # Built once up front, which also warms the tier files and the risk provider
+    layer = map_engine.build_layer(view_type)
+    styled = map_engine.style_layer(layer, 'Earthquake')
+    properties = choropleth.feature_properties(risk_layers.RISK_COLUMNS['Earthquake'])
+    return {
+        'build_layer': lambda: map_engine.build_layer(view_type),
+        'style_layer': lambda: map_engine.style_layer(layer, 'Earthquake'),
+        'geojson': lambda: geojson_encoding.encode(styled, properties),
+        'render_map': lambda: map_engine.render_map(view_type, 'Earthquake'),
+        'render_html': lambda: map_engine.render_map(view_type, 'Earthquake').get_root().render(),
+    }
+
+
+@pytest.mark.parametrize('stage', STAGES)
+@pytest.mark.parametrize('view_type', map_engine.VIEW_TYPES)
+def test_stage(benchmark, fixture_store, tmp_path, monkeypatch, view_type, stage):
+    run = _stages(view_type)[stage]
+    rounds = iter(range(ROUNDS))
+
+    def reset():
+        resource_cache.shared_cache().clear()
+        monkeypatch.setattr(render_cache, 'CACHE_DIR', str(tmp_path / f"round_{next(rounds)}"))
+        monkeypatch.setattr(render_cache, '_shared', None)
+
+    benchmark.group = view_type
+    benchmark.pedantic(run, setup=reset, rounds=ROUNDS)
@@ -0,0 +1,62 @@
+from streamlit.testing.v1 import AppTest
+
+import incremental_map
+import map_engine
+import risk_layers
+
+
+def _county_map_app():
+    import map_engine
+
+    map_engine.show_map('County', 'Earthquake', 2023)
+
+
+def _hex_map_app():
+    import map_engine
+
+    map_engine.show_map('Hex', 'Earthquake', 2023)
+
+
+def _zoom_to(at, zoom, lat=40.0, lng=-100.0):
+    component = at.session_state[incremental_map.COMPONENT_STATE]
+    at.session_state[component] = {'zoom': zoom, 'center': {'lat': lat, 'lng': lng}}
+    at.run()
+    assert not at.exception
+
+
+def test_tier_follows_live_zoom(fixture_store):
+    at = AppTest.from_function(_county_map_app, default_timeout=60)
+    at.run()
+    assert not at.exception
+    assert at.session_state[incremental_map.COMPONENT_STATE] == 'risk_map_County_coarse'
+
+    _zoom_to(at, 7)
+    assert at.session_state[incremental_map.COMPONENT_STATE] == 'risk_map_County_fine'
+    assert at.session_state[incremental_map.VIEW_STATE] == ([40.0, -100.0], 7)
+
+    # The newly mounted component has not reported yet, the view carries over
+    at.run()
+    assert at.session_state[incremental_map.COMPONENT_STATE] == 'risk_map_County_fine'
+
+
+def test_hex_resolution_follows_live_zoom(fixture_store):
+    at = AppTest.from_function(_hex_map_app, default_timeout=120)
+    at.run()
+    assert not at.exception
+    assert at.session_state[incremental_map.COMPONENT_STATE] == 'risk_map_Hex_4'
+
+    _zoom_to(at, 6)
+    assert at.session_state[incremental_map.COMPONENT_STATE] == 'risk_map_Hex_6'
+    coarse = map_engine.build_layer('Hex', 2023, 4)
+    fine = map_engine.build_layer('Hex', 2023, 6)
+    assert len(fine) > 3 * len(coarse)
+
+
+def test_tier_for_zoom():
+    assert risk_layers.layer_tier('County', 4) == 'coarse'
+    assert risk_layers.layer_tier('County', 6) == 'medium'
+    assert risk_layers.layer_tier('County', 8) == 'fine'
+    assert risk_layers.layer_tier('County', 11) == 'full'
+    assert risk_layers.layer_tier('Hex', 1) == 3
+    assert risk_layers.layer_tier('Hex', 5) == 5
+    assert risk_layers.layer_tier('Hex', 12) == 6
@@ -0,0 +1,19 @@
+import math
+
+import kpi_engine
+import point_aggregation
+import risk_data
+
+
+def test_point_dataset_serves_kpis(fixture_store, tmp_path):
+    points = point_aggregation.synthetic_points(2_000, years=[2022, 2023])
+    risk_data.write_dataset(points, str(tmp_path))
+    provider = point_aggregation.PointRiskProvider(str(tmp_path))
+
+    kpis = kpi_engine.compute_kpis(provider.iter_policies(2023, None, kpi_engine.KPI_COLUMNS, 500))
+    inside = provider.read_policies(2023, columns=kpi_engine.KPI_COLUMNS)
+    assert kpis['policies'] == len(inside) > 0
+    assert kpis['customers'] == inside['customer_id'].nunique()
+    assert math.isclose(kpis['revenue'], inside['premium'].sum())
+    assert 0 < kpis['loss_ratio'] < 1000
+
@@ -0,0 +1,44 @@
+import os
+import time
+
+import incremental_map
+import render_cache
+
+
+def _fill(cache, kind, n, size=4096):
+    # Random payloads so gzip cannot shrink them below the budget
+    for i in range(n):
+        cache.get_or_render(kind, lambda: os.urandom(size).hex(), entry=i)
+
+
+def test_disk_tier_keeps_to_budget(tmp_path):
+    cache = render_cache.RenderCache(1024 * 1024, str(tmp_path), disk_max_bytes=30000)
+    _fill(cache, 'html', 10)
+    files = [os.path.join(d, f) for d, _, names in os.walk(tmp_path) for f in names]
+    assert cache.stats()['disk_evictions'] > 0
+    assert sum(os.path.getsize(f) for f in files) == cache.disk_bytes <= 30000
+
+    # A restarted process picks the budget up from what is on disk
+    restarted = render_cache.RenderCache(1024 * 1024, str(tmp_path), disk_max_bytes=30000)
+    _fill(restarted, 'html', 1, size=8192)
+    assert restarted.disk_bytes <= 30000
+
+
+def test_expired_disk_entries_rerender(tmp_path):
+    cache = render_cache.RenderCache(1024 * 1024, str(tmp_path), max_age=3600)
+    cache.get_or_render('html', lambda: 'old', entry=0)
+    (path,) = [os.path.join(d, f) for d, _, names in os.walk(tmp_path) for f in names]
+    stale = time.time() - 7200
+    os.utime(path, (stale, stale))
+
+    restarted = render_cache.RenderCache(1024 * 1024, str(tmp_path), max_age=3600)
+    assert restarted.get_or_render('html', lambda: 'new', entry=0) == 'new'
+    assert restarted.stats()['renders'] == 1
+
+
+def test_warm_covers_live_geometry(fixture_store):
+    render_cache.warm(years=[2023])
+    renders = render_cache.stats()['renders']
+    incremental_map.base_map('County', 4)
+    incremental_map.base_map('Hex', 4)
+    assert render_cache.stats()['renders'] == renders
@@ -0,0 +1,98 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import risk_layers
+from resource_cache import ResourceCache, estimate_nbytes
+
+
+def test_get_or_load_loads_once():
+    cache = ResourceCache(1024)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return 'value'
+
+    assert cache.get_or_load('key', loader) == 'value'
+    assert cache.get_or_load('key', loader) == 'value'
+    assert len(calls) == 1
+    assert cache._key_locks == {}
+
+
+def test_failed_load_releases_key_lock():
+    cache = ResourceCache(1024)
+
+    def failing():
+        raise OSError('boom')
+
+    with pytest.raises(OSError):
+        cache.get_or_load('key', failing)
+    assert cache._key_locks == {}
+    assert cache.get_or_load('key', lambda: 'value') == 'value'
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_failed_load_keeps_lock_for_waiters():
+    cache = ResourceCache(1024)
+    release_first, release_second, second_started = threading.Event(), threading.Event(), threading.Event()
+    loads = []
+
+    def failing():
+        release_first.wait(5)
+        raise OSError('boom')
+
+    def slow():
+        loads.append('second')
+        second_started.set()
+        release_second.wait(5)
+        return 'value'
+
+    def call(loader):
+        try:
+            return cache.get_or_load('key', loader)
+        except OSError:
+            return None
+
+    waiters = lambda: cache._key_locks.get('key', [None, 0])[1]
+    first = threading.Thread(target=call, args=(failing,))
+    first.start()
+    _wait_for(lambda: waiters() == 1)
+    second = threading.Thread(target=call, args=(slow,))
+    second.start()
+    _wait_for(lambda: waiters() == 2)
+    release_first.set()
+    second_started.wait(5)
+
+    # A caller arriving after the failure queues on the same lock instead of loading alongside
+    third = threading.Thread(target=call, args=(lambda: loads.append('third'),))
+    third.start()
+    _wait_for(lambda: waiters() == 2)
+    release_second.set()
+    for thread in (first, second, third):
+        thread.join(5)
+    assert loads == ['second']
+    assert cache._key_locks == {}
+
+
+def test_estimate_nbytes_of_cached_objects(fixture_store):
+    import risk_cube
+    import spatial_index
+
+    kpis = {'policies': 10, 'revenue': np.float64(1.5), 'loss_ratio': float('nan')}
+    assert estimate_nbytes(kpis) > 0
+
+    index = spatial_index.SpatialIndex(risk_layers.load_boundaries('County'))
+    assert estimate_nbytes(index) >= len(index) * 64
+
+    values = np.zeros((2, 3, 2), dtype=np.float32)
+    cube = risk_cube.RiskCube([2022, 2023], {'County': np.arange(3)}, {'County': values})
+    assert estimate_nbytes(cube) == 2 * 8 + 3 * 8 + values.nbytes
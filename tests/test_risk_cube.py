@@ -0,0 +1,26 @@
+import numpy as np
+
+import risk_cube
+import risk_data
+
+
+def test_cube_years_missing_years_and_append(fixture_store, tmp_path):
+    policies = risk_data.SyntheticRiskProvider(years=[2020, 2021, 2022])
+    path = str(tmp_path / 'cube')
+    risk_cube.build_cube(policies, [2020, 2021]).save(path)
+
+    provider = risk_cube.CubeRiskProvider(path)
+    assert provider.years() == [2020, 2021]
+    version = provider.version()
+
+    # A year outside the cube is missing data, not an error
+    missing = provider.risk_scores('County', year=2022)
+    assert len(missing) == len(provider.risk_scores('County', year=2021))
+    assert np.isnan(missing[risk_cube.SCORE_COLUMNS].to_numpy()).all()
+
+    # An append on disk is picked up without a new provider
+    cube = risk_cube.append_year(risk_cube.RiskCube.load(path, mmap_mode=None), policies, 2022)
+    cube.save(path)
+    assert provider.years() == [2020, 2021, 2022]
+    assert provider.version() != version
+    assert not np.isnan(provider.risk_scores('County', year=2022)[risk_cube.SCORE_COLUMNS].to_numpy()).any()
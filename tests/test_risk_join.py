@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+import boundary_store
+import risk_data
+import risk_layers
+
+
+def test_join_keeps_one_row_per_geometry_with_duplicate_names(fixture_store):
+    counties = boundary_store.load_layer('county')
+    assert counties['NAME'].duplicated().any()
+    risk_table = risk_data.SyntheticRiskProvider().risk_scores('County', year=2023)
+
+    layer_risk = risk_layers.join_risk(counties, risk_table)
+
+    assert len(layer_risk) == len(counties)
+    assert list(layer_risk['GEOID']) == list(counties['GEOID'])
+    assert layer_risk[list(risk_layers.RISK_COLUMNS.values())].notna().all().all()
+
+
+def test_join_rejects_duplicate_keys(fixture_store):
+    counties = boundary_store.load_layer('county')
+    risk_table = risk_data.SyntheticRiskProvider().risk_scores('County', year=2023)
+    duplicated = pd.concat([risk_table, risk_table.iloc[:1]], ignore_index=True)
+
+    with pytest.raises(risk_layers.RiskJoinError):
+        risk_layers.join_risk(counties, duplicated)
+    with pytest.raises(risk_layers.RiskJoinError):
+        risk_layers.join_risk(pd.concat([counties, counties.iloc[:1]]), risk_table)
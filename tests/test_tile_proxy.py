@@ -0,0 +1,46 @@
+import urllib.request
+
+import pytest
+
+import background_server
+import tile_proxy
+
+
+class RecordingMap:
+    def __init__(self):
+        self.calls = []
+
+    def add_tile_layer(self, tiles, **kwargs):
+        self.calls.append(('tile_layer', tiles))
+
+    def add_basemap(self, basemap):
+        self.calls.append(('basemap', basemap))
+
+
+def test_keyed_basemap_is_an_upstream_error():
+    with pytest.raises(tile_proxy.UpstreamError):
+        tile_proxy.upstream('Thunderforest.OpenCycleMap')
+
+
+def test_keyed_basemap_falls_back_to_upstream(monkeypatch):
+    monkeypatch.setattr(tile_proxy, 'ENABLED', True)
+    m = RecordingMap()
+    tile_proxy.add_basemap(m, 'Thunderforest.OpenCycleMap')
+    assert m.calls == [('basemap', 'Thunderforest.OpenCycleMap')]
+
+
+def test_background_server_serves_cached_tiles(tmp_path):
+    cache = tile_proxy.TileCache(str(tmp_path), 1024 * 1024)
+    cache.put('cartodbpositron', 3, 1, 2, b'\x89PNG tile')
+    server = background_server.BackgroundServer(
+        lambda: tile_proxy.make_server(tile_proxy.TileProxy(cache), '127.0.0.1', 0))
+    started = server.ensure()
+    try:
+        assert server.ensure() is started
+        url = f"http://127.0.0.1:{started.server_address[1]}/cartodbpositron/3/1/2.png"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.read() == b'\x89PNG tile'
+            assert response.headers['Content-Type'] == 'image/png'
+    finally:
+        started.shutdown()
+        started.server_close()
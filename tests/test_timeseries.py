@@ -0,0 +1,58 @@
+import warnings
+
+import numpy as np
+import pytest
+
+import timeseries
+from bench_timeseries import make_series
+
+MAX_POINTS = 2 * timeseries.DEFAULT_WIDTH
+
+
+@pytest.mark.parametrize('n', [1_000, 10_000, 1_000_000])
+@pytest.mark.parametrize('columns', [1, 3])
+@pytest.mark.parametrize('method', ['minmax', 'lttb'])
+def test_point_count_and_end_points(n, columns, method):
+    frame = make_series(n, columns)
+    reduced = timeseries.downsample(frame, MAX_POINTS, method)
+    assert len(reduced) <= MAX_POINTS
+    assert reduced.index[0] == frame.index[0]
+    assert reduced.index[-1] == frame.index[-1]
+
+
+@pytest.mark.parametrize('n', [10_000, 1_000_000])
+@pytest.mark.parametrize('columns', [1, 3])
+def test_minmax_keeps_extrema(n, columns):
+    frame = make_series(n, columns)
+    reduced = timeseries.downsample(frame, MAX_POINTS, 'minmax')
+    for column in frame.columns:
+        assert reduced[column].max() == frame[column].max()
+        assert reduced[column].min() == frame[column].min()
+
+
+def test_lttb_keeps_requested_count():
+    frame = make_series(100_000, 1)
+    keep = timeseries.lttb_indices(timeseries._positions(frame.index), frame['s0'].to_numpy(), 500)
+    assert len(keep) == 500
+    assert keep[0] == 0 and keep[-1] == len(frame) - 1
+    assert (np.diff(keep) > 0).all()
+
+
+def test_short_series_unchanged():
+    frame = make_series(1_000, 1)
+    assert timeseries.downsample(frame, 2_000, 'lttb') is frame
+
+
+def test_lttb_handles_all_nan_buckets():
+    frame = make_series(10_000, 1)
+    y = frame['s0'].to_numpy().copy()
+    y[2_000:4_000] = np.nan
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        keep = timeseries.lttb_indices(timeseries._positions(frame.index), y, 200)
+    assert len(keep) == 200
+    assert (np.diff(keep) > 0).all()
+    # Points after the gap are still picked by area, not just the start of each bucket
+    after = keep[keep > 4_100]
+    assert not np.isnan(y[keep[(keep < 2_000) | (keep >= 4_000)]]).any()
+    assert len(np.unique(np.diff(after))) > 1
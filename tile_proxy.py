@@ -0,0 +1,366 @@
+"""Local caching proxy for the raster basemaps.
+
+Browsers fetch basemap tiles (cartodbpositron, OpenTopoMap, the geemap
+basemaps...) from this server instead of the upstream tile servers. Tiles
+are kept on disk as ``<cache dir>/<basemap>/<z>/<x>/<y>`` files; the cache
+is limited to ``TILE_PROXY_MAX_MB`` and evicts the least recently used
+tiles. Misses are fetched from upstream on a thread pool, and concurrent
+requests for the same tile share one upstream fetch.
+
+Turn it on with ``MAP_TILE_PROXY=1``: the map builders then point their
+basemaps at ``TILE_PROXY_URL`` and start the proxy in-process if nothing is
+listening there yet. It can also run as its own service, and be seeded
+ahead of time on a machine with internet access:
+
+    python tile_proxy.py serve
+    python tile_proxy.py seed --basemap cartodbpositron --bbox -125 24 -66 50 --max-zoom 7
+
+Basemaps are looked up in ``UPSTREAMS``, then by name in xyzservices (which
+leafmap and geemap depend on), so every entry in ``geemap.basemaps`` works.
+"""
+import argparse
+import math
+import os
+import sys
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+
+import background_server
+
+ENABLED = os.environ.get('MAP_TILE_PROXY', '0') == '1'
+
+CACHE_DIR = os.environ.get(
+    'TILE_PROXY_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'tile_cache'))
+MAX_MB = float(os.environ.get('TILE_PROXY_MAX_MB', '1024'))
+WORKERS = int(os.environ.get('TILE_PROXY_WORKERS', '16'))
+TIMEOUT = float(os.environ.get('TILE_PROXY_TIMEOUT', '10'))
+
+SERVER_HOST = os.environ.get('TILE_PROXY_HOST', '127.0.0.1')
+SERVER_PORT = int(os.environ.get('TILE_PROXY_PORT', '8766'))
+# Address the browser uses to reach the proxy
+PUBLIC_URL = os.environ.get('TILE_PROXY_URL', f'http://localhost:{SERVER_PORT}')
+
+# Some tile servers reject requests without an identifying user agent
+USER_AGENT = 'Streamlit_Test-tile-proxy/1.0'
+
+# basemap -> (URL template, attribution)
+UPSTREAMS = {
+    'cartodbpositron': (
+        'https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}.png',
+        '&copy; OpenStreetMap contributors &copy; CARTO'),
+    'OpenTopoMap': (
+        'https://{s}.tile.opentopomap.org/{z}/{x}/{y}.png',
+        'Map data: &copy; OpenStreetMap contributors, SRTM | Map style: &copy; OpenTopoMap (CC-BY-SA)'),
+    'OpenStreetMap': (
+        'https://tile.openstreetmap.org/{z}/{x}/{y}.png',
+        '&copy; OpenStreetMap contributors'),
+}
+SUBDOMAINS = 'abc'
+
+
+class UpstreamError(RuntimeError):
+    pass
+
+
+def upstream(basemap):
+    """(URL template, attribution) of ``basemap``, from UPSTREAMS or xyzservices."""
+    if basemap in UPSTREAMS:
+        return UPSTREAMS[basemap]
+    try:
+        import xyzservices
+        provider = xyzservices.providers.query_name(basemap)
+    except (ImportError, ValueError):
+        raise UpstreamError(f"Unknown basemap: {basemap!r}") from None
+    try:
+        return provider.build_url(), provider.html_attribution
+    except ValueError as e:
+        # Providers that need an API key refuse to build a URL without one
+        raise UpstreamError(f"{basemap}: {e}") from e
+
+
+def upstream_url(basemap, z, x, y):
+    template, _ = upstream(basemap)
+    return template.format(s=SUBDOMAINS[(x + y) % len(SUBDOMAINS)], z=z, x=x, y=y, r='')
+
+
+def tile_range(west, south, east, north, z):
+    """Inclusive x and y XYZ tile ranges covering a lon/lat bounding box at zoom ``z``."""
+    last = 2 ** z - 1
+
+    def tile_x(lon):
+        return min(max(int((lon + 180) / 360 * 2 ** z), 0), last)
+
+    def tile_y(lat):
+        lat = max(min(lat, 85.0511), -85.0511)
+        y = (1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * 2 ** z
+        return min(max(int(y), 0), last)
+
+    return range(tile_x(west), tile_x(east) + 1), range(tile_y(north), tile_y(south) + 1)
+
+
+class TileCache:
+    """Directory tile cache with a byte budget, evicting the least recently used tiles."""
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._scan()
+
+    def _scan(self):
+        # Rebuild the LRU order from the access times left by earlier runs
+        found = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith('.tmp'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                stat = os.stat(path)
+                found.append((stat.st_atime, path, stat.st_size))
+        for _, path, size in sorted(found):
+            self._entries[path] = size
+            self.bytes += size
+
+    def _path(self, basemap, z, x, y):
+        return os.path.join(self.root, basemap, str(z), str(x), str(y))
+
+    def get(self, basemap, z, x, y):
+        path = self._path(basemap, z, x, y)
+        with self._lock:
+            if path not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(path)
+            self.hits += 1
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            # Evicted between the lookup and the read
+            return None
+
+    def put(self, basemap, z, x, y, data):
+        path = self._path(basemap, z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.bytes += len(data) - self._entries.pop(path, 0)
+            self._entries[path] = len(data)
+            while self.bytes > self.max_bytes and len(self._entries) > 1:
+                old_path, size = self._entries.popitem(last=False)
+                self.bytes -= size
+                self.evictions += 1
+                try:
+                    os.remove(old_path)
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'tiles': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+class TileProxy:
+    """Cache-first tile lookup with concurrent, de-duplicated upstream fetches."""
+
+    def __init__(self, cache, workers=WORKERS, timeout=TIMEOUT):
+        self.cache = cache
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tile-proxy')
+        self._pending = {}
+        # Reentrant: a future that is already done runs its callback inside fetch()
+        self._lock = threading.RLock()
+
+    def fetch_upstream(self, basemap, z, x, y):
+        request = urllib.request.Request(upstream_url(basemap, z, x, y), headers={'User-Agent': USER_AGENT})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.read()
+        except OSError as e:
+            raise UpstreamError(f"{basemap} {z}/{x}/{y}: {e}") from e
+
+    def _fetch_and_store(self, basemap, z, x, y):
+        data = self.fetch_upstream(basemap, z, x, y)
+        self.cache.put(basemap, z, x, y, data)
+        return data
+
+    def fetch(self, basemap, z, x, y):
+        """Future of the tile bytes, shared by every caller asking for the same tile meanwhile."""
+        key = (basemap, z, x, y)
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pool.submit(self._fetch_and_store, basemap, z, x, y)
+                self._pending[key] = future
+                future.add_done_callback(lambda _: self._forget(key))
+            return future
+
+    def _forget(self, key):
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def get(self, basemap, z, x, y):
+        data = self.cache.get(basemap, z, x, y)
+        if data is None:
+            data = self.fetch(basemap, z, x, y).result()
+        return data
+
+    def seed(self, basemap, bbox, min_zoom, max_zoom):
+        """Fetch every missing tile of ``bbox`` (west, south, east, north) at the zoom levels; returns counts."""
+        futures = []
+        cached = 0
+        for z in range(min_zoom, max_zoom + 1):
+            xs, ys = tile_range(*bbox, z)
+            for x in xs:
+                for y in ys:
+                    if os.path.exists(self.cache._path(basemap, z, x, y)):
+                        cached += 1
+                    else:
+                        futures.append(self.fetch(basemap, z, x, y))
+        failed = sum(1 for future in futures if future.exception() is not None)
+        return {'cached': cached, 'fetched': len(futures) - failed, 'failed': failed}
+
+
+_CONTENT_TYPES = {b'\x89PNG': 'image/png', b'\xff\xd8\xff': 'image/jpeg', b'RIFF': 'image/webp'}
+
+
+def _content_type(data):
+    for magic, content_type in _CONTENT_TYPES.items():
+        if data.startswith(magic):
+            return content_type
+    return 'application/octet-stream'
+
+
+class _ProxyHandler(BaseHTTPRequestHandler):
+    proxy = None
+
+    def do_GET(self):
+        parts = self.path.split('?', 1)[0].strip('/').split('/')
+        try:
+            basemap, z, x = parts[0], int(parts[1]), int(parts[2])
+            y = int(parts[3].split('.', 1)[0])
+        except (IndexError, ValueError):
+            self.send_error(404)
+            return
+        try:
+            data = self.proxy.get(basemap, z, x, y)
+        except UpstreamError as e:
+            self.send_error(502, str(e))
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', _content_type(data))
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', 'public, max-age=86400')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def open_proxy(cache_dir=None, max_mb=None):
+    return TileProxy(TileCache(cache_dir or CACHE_DIR, int((max_mb or MAX_MB) * 1024 * 1024)))
+
+
+def make_server(proxy=None, host=SERVER_HOST, port=SERVER_PORT):
+    return background_server.make_server(_ProxyHandler, host, port, proxy=proxy or open_proxy())
+
+
+_server = background_server.BackgroundServer(make_server)
+
+
+def ensure_server(proxy=None):
+    """Start the proxy in a background thread, once per process (see background_server.py)."""
+    return _server.ensure(proxy)
+
+
+def proxied_tiles(basemap):
+    """(tiles URL, attribution) of ``basemap`` through the proxy, for folium / leafmap tile layers."""
+    _, attribution = upstream(basemap)
+    ensure_server()
+    return f"{PUBLIC_URL}/{basemap}/{{z}}/{{x}}/{{y}}", attribution
+
+
+def add_basemap(m, basemap):
+    """``m.add_basemap(basemap)`` for a leafmap / geemap map, through the proxy when enabled.
+
+    Basemaps the proxy cannot resolve (e.g. ones needing an API key) are
+    added straight from upstream.
+    """
+    if ENABLED:
+        try:
+            tiles, attribution = proxied_tiles(basemap)
+        except UpstreamError:
+            pass
+        else:
+            return m.add_tile_layer(tiles, name=basemap, attribution=attribution)
+    return m.add_basemap(basemap)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cache-dir', default=None, help=f'Tile cache directory (default: {CACHE_DIR})')
+    parser.add_argument('--max-mb', type=float, default=None, help=f'Cache size limit (default: {MAX_MB:g})')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve = subparsers.add_parser('serve', help='Serve basemap tiles through the cache')
+    serve.add_argument('--host', default=SERVER_HOST)
+    serve.add_argument('--port', type=int, default=SERVER_PORT)
+
+    seed = subparsers.add_parser('seed', help='Pre-fetch the tiles of a bounding box')
+    seed.add_argument('--basemap', required=True, nargs='+')
+    seed.add_argument('--bbox', type=float, nargs=4, metavar=('WEST', 'SOUTH', 'EAST', 'NORTH'),
+                      default=[-125.0, 24.0, -66.0, 50.0])
+    seed.add_argument('--min-zoom', type=int, default=0)
+    seed.add_argument('--max-zoom', type=int, default=6)
+
+    subparsers.add_parser('stats', help='Show the cache size')
+
+    args = parser.parse_args(argv)
+    proxy = open_proxy(args.cache_dir, args.max_mb)
+
+    if args.command == 'serve':
+        server = make_server(proxy, args.host, args.port)
+        print(f"Proxying basemap tiles on http://{args.host}:{args.port}/<basemap>/<z>/<x>/<y>")
+        server.serve_forever()
+    elif args.command == 'seed':
+        for basemap in args.basemap:
+            start = time.perf_counter()
+            counts = proxy.seed(basemap, args.bbox, args.min_zoom, args.max_zoom)
+            print(f"{basemap}: {counts['fetched']} fetched, {counts['cached']} already cached, "
+                  f"{counts['failed']} failed in {time.perf_counter() - start:.1f}s")
+        stats = proxy.cache.stats()
+        print(f"cache: {stats['tiles']} tiles, {stats['bytes'] / 1024 ** 2:.1f} MB")
+    elif args.command == 'stats':
+        stats = proxy.cache.stats()
+        print(f"{stats['tiles']} tiles, {stats['bytes'] / 1024 ** 2:.1f} of "
+              f"{stats['max_bytes'] / 1024 ** 2:.0f} MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""Downsampled line charts: never ship more points than the chart has pixels.
+
+A line chart ``width`` pixels wide cannot show more than a minimum and a
+maximum per pixel column, so series are reduced before they reach
+``st.line_chart`` or matplotlib:
+
+    minmax   keeps the min and max point of each pixel bucket and both ends
+             (the default; preserves every peak, fully vectorized)
+    lttb     Largest-Triangle-Three-Buckets, one point per bucket chosen to
+             keep the visual shape; smoother, for single series
+
+Frames with several columns keep the union of each column's points, with
+the per-column budget shrunk so the total stays within ``max_points``.
+tests/test_timeseries.py checks the point-count bounds, benchmarks/bench_timeseries.py
+times them.
+"""
+import numpy as np
+import pandas as pd
+
+# Assumed chart width when the caller does not know it (container width)
+DEFAULT_WIDTH = 800
+
+
+def minmax_indices(values, n_buckets):
+    """Sorted indices of the min and max of each of ``n_buckets`` buckets, plus the first and last point."""
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n <= max(2 * n_buckets, 2):
+        return np.arange(n)
+    if n_buckets < 1:
+        return np.array([0, n - 1])
+    size = -(-n // n_buckets)
+    padded = np.full(size * (-(-n // size)), np.nan)
+    padded[:n] = values
+    rows = padded.reshape(-1, size)
+    # NaN never wins a bucket, an all-NaN bucket just yields its first index
+    lows = np.where(np.isnan(rows), np.inf, rows).argmin(axis=1)
+    highs = np.where(np.isnan(rows), -np.inf, rows).argmax(axis=1)
+    offsets = np.arange(len(rows)) * size
+    keep = np.concatenate([[0, n - 1], offsets + lows, offsets + highs])
+    return np.unique(keep[keep < n])
+
+
+def lttb_indices(x, y, n_out):
+    """Indices of the ``n_out`` points Largest-Triangle-Three-Buckets keeps, first and last included."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        raise ValueError("LTTB needs at least 3 output points")
+
+    # Inner points split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    valid = ~np.isnan(y)
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if not valid[start:end].any():
+            # Gap in the data: keep the bucket's midpoint, the next triangle still starts at the last real point
+            keep[i + 1] = (start + end - 1) // 2
+            continue
+        # Average of the next bucket (the last point for the final bucket)
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_valid = valid[end:next_end]
+        if end >= next_end:
+            next_x, next_y = x[-1], y[-1]
+        elif next_valid.any():
+            next_x, next_y = x[end:next_end][next_valid].mean(), y[end:next_end][next_valid].mean()
+        else:
+            # All-NaN next bucket: aim level with the previous point at its midpoint
+            next_x, next_y = x[(end + next_end - 1) // 2], y[previous]
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(np.nan_to_num(areas, nan=-1.0)))
+        keep[i + 1] = previous
+    return keep
+
+
+def _positions(index):
+    """Numeric x positions of a frame index (datetimes as nanoseconds, other labels by position)."""
+    if pd.api.types.is_datetime64_any_dtype(index):
+        return index.asi8.astype(float)
+    if pd.api.types.is_numeric_dtype(index):
+        return np.asarray(index, dtype=float)
+    return np.arange(len(index), dtype=float)
+
+
+def downsample(data, max_points, method='minmax'):
+    """Rows of ``data`` (a DataFrame or Series) to draw with at most ``max_points`` points per chart."""
+    frame = data.to_frame() if isinstance(data, pd.Series) else data
+    if len(frame) <= max_points:
+        return data
+    columns = frame.select_dtypes('number').columns
+    if len(columns) == 0:
+        return data.iloc[np.linspace(0, len(frame) - 1, max_points).astype(int)]
+
+    per_column = max(max_points // len(columns), 3)
+    x = _positions(frame.index)
+    keep = []
+    for column in columns:
+        values = frame[column].to_numpy(dtype=float)
+        if method == 'lttb':
+            keep.append(lttb_indices(x, values, per_column))
+        elif method == 'minmax':
+            # Two points per bucket plus the two end points
+            keep.append(minmax_indices(values, (per_column - 2) // 2))
+        else:
+            raise ValueError(f"Unknown downsampling method: {method!r}")
+    return data.iloc[np.unique(np.concatenate(keep))]
+
+
+def line_chart(data, width=None, method='minmax', **kwargs):
+    """``st.line_chart`` of ``data`` reduced to two points per pixel of ``width``."""
+    import streamlit as st
+
+    max_points = 2 * (width or DEFAULT_WIDTH)
+    if width is not None:
+        kwargs['width'] = width
+    return st.line_chart(downsample(data, max_points, method), **kwargs)
+
+
+def plot_line(ax, x, y, method='minmax', **kwargs):
+    """``ax.plot(x, y)`` reduced to two points per pixel of the axes width."""
+    width = int(ax.get_window_extent().width) or DEFAULT_WIDTH
+    series = pd.Series(np.asarray(y), index=pd.Index(np.asarray(x)))
+    reduced = downsample(series, 2 * width, method)
+    return ax.plot(reduced.index, reduced.to_numpy(), **kwargs)
@@ -0,0 +1,142 @@
+"""Lightweight per-rerun tracing for the map and dashboard pipeline.
+
+Wrap a rerun in ``trace()`` and its stages in ``span()``; spans nest and are
+collected per rerun (context-local, so concurrent sessions do not mix).
+When the trace ends it is appended to ``TRACE_FILE`` as JSON lines, one span
+per line, using OpenTelemetry field names (trace_id, span_id,
+parent_span_id, start/end_time_unix_nano, attributes) so the file can be
+loaded into OTel tooling. With ``TRACE_PANEL=1`` the apps show the
+breakdown for the current rerun in a sidebar panel.
+
+    with tracing.trace('maps'):
+        with tracing.span('load', layer='county'):
+            ...
+"""
+import contextlib
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+
+TRACE_FILE = os.environ.get('TRACE_FILE')
+PANEL_ENABLED = os.environ.get('TRACE_PANEL', '0') == '1'
+
+# (trace, parent span) of the code currently running
+_current = contextvars.ContextVar('tracing_current', default=(None, None))
+_export_lock = threading.Lock()
+
+
+class Span:
+
+    def __init__(self, trace_id, name, parent_id, attributes):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    @property
+    def duration_ms(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_span_id': self.parent_id,
+            'name': self.name,
+            'start_time_unix_nano': self.start_ns,
+            'end_time_unix_nano': self.end_ns,
+            'attributes': self.attributes,
+        }
+
+
+class Trace:
+
+    def __init__(self, name):
+        self.trace_id = secrets.token_hex(16)
+        self.name = name
+        self.spans = []
+
+    def depth(self, span):
+        by_id = {s.span_id: s for s in self.spans}
+        depth = 0
+        while span.parent_id in by_id:
+            span = by_id[span.parent_id]
+            depth += 1
+        return depth
+
+
+@contextlib.contextmanager
+def trace(name, **attributes):
+    """Collect every span opened inside the block into one trace, exported on exit.
+
+    Inside another trace this is just a span of the outer one.
+    """
+    outer, _ = _current.get()
+    if outer is not None:
+        with span(name, **attributes):
+            yield outer
+        return
+    current = Trace(name)
+    root = Span(current.trace_id, name, None, attributes)
+    current.spans.append(root)
+    token = _current.set((current, root))
+    try:
+        yield current
+    finally:
+        root.end_ns = time.time_ns()
+        _current.reset(token)
+        export(current)
+
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    """Time the block as a child of the innermost open span; a no-op outside a trace."""
+    current, parent = _current.get()
+    if current is None:
+        yield None
+        return
+    child = Span(current.trace_id, name, parent.span_id, attributes)
+    current.spans.append(child)
+    token = _current.set((current, child))
+    try:
+        yield child
+    finally:
+        child.end_ns = time.time_ns()
+        _current.reset(token)
+
+
+def export(finished, path=None):
+    path = path or TRACE_FILE
+    if not path:
+        return
+    lines = ''.join(json.dumps(s.to_dict(), default=str) + '\n' for s in finished.spans)
+    with _export_lock:
+        with open(path, 'a') as f:
+            f.write(lines)
+
+
+def debug_panel(finished):
+    """Sidebar breakdown of ``finished`` when TRACE_PANEL=1."""
+    if not PANEL_ENABLED or finished is None:
+        return
+    import pandas as pd
+    import streamlit as st
+
+    import render_cache
+
+    rows = [{
+        'stage': '  ' * finished.depth(s) + s.name,
+        'ms': round(s.duration_ms, 1),
+        'details': ', '.join(f"{k}={v}" for k, v in s.attributes.items()),
+    } for s in finished.spans]
+    with st.sidebar.expander("Rerun timings", expanded=False):
+        st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+        cache = render_cache.stats()
+        st.caption(f"Render cache: {cache['hit_rate']:.0%} hits over {cache['lookups']} lookups, "
+                   f"p95 render {cache['render_ms_p95']:.0f} ms")
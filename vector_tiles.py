@@ -0,0 +1,345 @@
+"""Optional vector tile mode for the risk maps.
+
+Instead of embedding the full FeatureCollection in the page, the boundary
+layers are cut into Mapbox Vector Tiles once, stored as a z/x/y directory or
+one MBTiles file per layer, and served from a small local HTTP server. The
+browser only fetches the tiles in view; the risk colours travel as a small
+GEOID -> colour lookup in the layer style.
+
+Turn it on with ``MAP_VECTOR_TILES=1``. Tiles are built on first use, or
+ahead of time with:
+
+    python vector_tiles.py build --layer county
+    python vector_tiles.py build --layer tract --source tl_2020_06_tract.zip --format mbtiles
+
+Any boundary file can be tiled with ``--source``, which is what makes finer
+layers (tracts, 500k shapefiles) practical.
+"""
+import argparse
+import gzip
+import json
+import math
+import os
+import sqlite3
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler
+
+import numpy as np
+import shapely
+
+import background_server
+import boundary_store
+import risk_layers
+import simplification
+
+ENABLED = os.environ.get('MAP_VECTOR_TILES', '0') == '1'
+
+TILE_DIR = os.environ.get(
+    'VECTOR_TILE_DIR', os.path.join(os.path.dirname(boundary_store.STORE_DIR), 'tiles'))
+TILE_FORMAT = os.environ.get('VECTOR_TILE_FORMAT', 'dir')  # 'dir' or 'mbtiles'
+
+SERVER_HOST = os.environ.get('VECTOR_TILE_HOST', '127.0.0.1')
+SERVER_PORT = int(os.environ.get('VECTOR_TILE_PORT', '8765'))
+# Address the browser uses to reach the tile server, override behind a reverse proxy
+PUBLIC_URL = os.environ.get('VECTOR_TILE_URL', f'http://localhost:{SERVER_PORT}')
+
+MIN_ZOOM = 2
+MAX_ZOOM = 8      # deeper zooms overzoom the max-zoom tiles on the client
+EXTENT = 4096     # tile coordinate resolution
+BUFFER = 64       # clip buffer around each tile, in tile units
+
+# Properties kept in the tiles, everything else stays on the server
+TILE_PROPERTIES = ['GEOID', 'NAME']
+
+_HALF_WORLD = 20037508.342789244  # half the web mercator extent in metres
+
+
+def tile_bounds(z, x, y):
+    """Web mercator bounds (minx, miny, maxx, maxy) of XYZ tile ``z/x/y``."""
+    size = 2 * _HALF_WORLD / 2 ** z
+    minx = -_HALF_WORLD + x * size
+    maxy = _HALF_WORLD - y * size
+    return minx, maxy - size, minx + size, maxy
+
+
+def tile_range(bounds, z):
+    """Inclusive x and y tile index ranges covering web mercator ``bounds`` at zoom ``z``."""
+    size = 2 * _HALF_WORLD / 2 ** z
+    last = 2 ** z - 1
+    minx, miny, maxx, maxy = bounds
+
+    def clamp(value):
+        return min(max(int(math.floor(value)), 0), last)
+    return (range(clamp((minx + _HALF_WORLD) / size), clamp((maxx + _HALF_WORLD) / size) + 1),
+            range(clamp((_HALF_WORLD - maxy) / size), clamp((_HALF_WORLD - miny) / size) + 1))
+
+
+class DirectoryTileStore:
+    """Tiles as ``<root>/<layer>/<z>/<x>/<y>.pbf`` (gzipped), metadata in ``<layer>/metadata.json``."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def put(self, layer, z, x, y, data):
+        path = os.path.join(self.root, layer, str(z), str(x), f"{y}.pbf")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def get(self, layer, z, x, y):
+        path = os.path.join(self.root, layer, str(z), str(x), f"{y}.pbf")
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def read_metadata(self, layer):
+        path = os.path.join(self.root, layer, 'metadata.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def write_metadata(self, layer, metadata):
+        os.makedirs(os.path.join(self.root, layer), exist_ok=True)
+        with open(os.path.join(self.root, layer, 'metadata.json'), 'w') as f:
+            json.dump(metadata, f, indent=2, sort_keys=True)
+
+
+class MBTilesStore:
+    """One standard MBTiles file per layer, ``<root>/<layer>.mbtiles`` (TMS rows, gzipped tiles)."""
+
+    def __init__(self, root):
+        self.root = root
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def _connect(self, layer):
+        with self._lock:
+            if layer not in self._connections:
+                os.makedirs(self.root, exist_ok=True)
+                conn = sqlite3.connect(os.path.join(self.root, f"{layer}.mbtiles"),
+                                       check_same_thread=False)
+                conn.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)")
+                conn.execute("CREATE TABLE IF NOT EXISTS tiles (zoom_level INTEGER, tile_column INTEGER, "
+                             "tile_row INTEGER, tile_data BLOB, "
+                             "PRIMARY KEY (zoom_level, tile_column, tile_row))")
+                self._connections[layer] = conn
+            return self._connections[layer]
+
+    def put(self, layer, z, x, y, data):
+        conn = self._connect(layer)
+        with self._lock:
+            conn.execute("INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)",
+                         (z, x, 2 ** z - 1 - y, sqlite3.Binary(data)))
+            conn.commit()
+
+    def get(self, layer, z, x, y):
+        conn = self._connect(layer)
+        with self._lock:
+            row = conn.execute("SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? "
+                               "AND tile_row = ?", (z, x, 2 ** z - 1 - y)).fetchone()
+        return bytes(row[0]) if row else None
+
+    def read_metadata(self, layer):
+        if not os.path.exists(os.path.join(self.root, f"{layer}.mbtiles")):
+            return None
+        conn = self._connect(layer)
+        with self._lock:
+            rows = dict(conn.execute("SELECT name, value FROM metadata").fetchall())
+        return json.loads(rows['json']) if 'json' in rows else None
+
+    def write_metadata(self, layer, metadata):
+        conn = self._connect(layer)
+        rows = {'name': layer, 'format': 'pbf', 'minzoom': str(metadata['min_zoom']),
+                'maxzoom': str(metadata['max_zoom']), 'json': json.dumps(metadata, sort_keys=True)}
+        with self._lock:
+            conn.executemany("INSERT OR REPLACE INTO metadata VALUES (?, ?)", rows.items())
+            conn.commit()
+
+
+def open_tile_store(root=None, tile_format=None):
+    root = root or TILE_DIR
+    tile_format = tile_format or TILE_FORMAT
+    if tile_format == 'mbtiles':
+        return MBTilesStore(root)
+    if tile_format == 'dir':
+        return DirectoryTileStore(root)
+    raise ValueError(f"Unknown tile format: {tile_format!r}")
+
+
+def encode_tile(layer, geoms, properties, z, x, y):
+    """Clip ``geoms`` to tile ``z/x/y`` and encode them as a gzipped MVT, None if empty."""
+    import mapbox_vector_tile
+
+    minx, miny, maxx, maxy = tile_bounds(z, x, y)
+    pad = (maxx - minx) * BUFFER / EXTENT
+    clipped = shapely.clip_by_rect(geoms, minx - pad, miny - pad, maxx + pad, maxy + pad)
+    features = [{'geometry': geom, 'properties': props}
+                for geom, props in zip(clipped, properties) if not geom.is_empty]
+    if not features:
+        return None
+    data = mapbox_vector_tile.encode(
+        [{'name': layer, 'features': features}],
+        default_options={'quantize_bounds': (minx, miny, maxx, maxy), 'extents': EXTENT},
+    )
+    return gzip.compress(data)
+
+
+def build_tiles(layer, store=None, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, gdf=None):
+    """Cut ``layer`` into tiles for every zoom level in ``[min_zoom, max_zoom]``.
+
+    Store layers use the simplification tier for each zoom; pass ``gdf`` to
+    tile any other boundary file at full resolution. Returns the tile count.
+    """
+    store = store or open_tile_store()
+    count = 0
+    for z in range(min_zoom, max_zoom + 1):
+        source = gdf if gdf is not None else boundary_store.load_layer(
+            layer, tier=simplification.tier_for_zoom(z))
+        columns = [c for c in TILE_PROPERTIES if c in source.columns]
+        mercator = source[columns + [source.geometry.name]].to_crs(epsg=3857)
+        geoms = np.asarray(mercator.geometry.values)
+        records = mercator[columns].to_dict('records')
+        tree = shapely.STRtree(geoms)
+
+        xs, ys = tile_range(mercator.total_bounds, z)
+        for x in xs:
+            for y in ys:
+                idx = tree.query(shapely.box(*tile_bounds(z, x, y)), predicate='intersects')
+                if not len(idx):
+                    continue
+                data = encode_tile(layer, geoms[idx], [records[i] for i in idx], z, x, y)
+                if data is not None:
+                    store.put(layer, z, x, y, data)
+                    count += 1
+
+    store.write_metadata(layer, {
+        'min_zoom': min_zoom,
+        'max_zoom': max_zoom,
+        'data_version': boundary_store.data_version() if gdf is None else None,
+        'tiles': count,
+    })
+    return count
+
+
+_build_lock = threading.Lock()
+
+
+def serves(view_type):
+    """True if ``view_type`` is drawn from vector tiles; the hex grid is light enough to stay inline."""
+    return ENABLED and view_type in risk_layers.VIEW_LAYERS
+
+
+def ensure_tiles(layer, store=None):
+    """Build the tiles for a store layer if they are missing or out of date."""
+    store = store or open_tile_store()
+    with _build_lock:
+        metadata = store.read_metadata(layer)
+        if metadata is None or metadata.get('data_version') != boundary_store.data_version():
+            build_tiles(layer, store)
+    return store
+
+
+class _TileHandler(BaseHTTPRequestHandler):
+    store = None
+
+    def do_GET(self):
+        parts = self.path.split('?', 1)[0].strip('/').split('/')
+        try:
+            layer, z, x, y = parts[0], int(parts[1]), int(parts[2]), int(parts[3].removesuffix('.pbf'))
+        except (IndexError, ValueError):
+            self.send_error(404)
+            return
+        data = self.store.get(layer, z, x, y)
+        if data is None:
+            # Nothing in this tile
+            self.send_response(204)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-protobuf')
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', 'public, max-age=86400')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(store=None, host=SERVER_HOST, port=SERVER_PORT):
+    return background_server.make_server(_TileHandler, host, port, store=store or open_tile_store())
+
+
+_server = background_server.BackgroundServer(make_server)
+
+
+def ensure_server(store=None):
+    """Start the tile server in a background thread, once per process (see background_server.py)."""
+    return _server.ensure(store)
+
+
+def add_risk_tile_layer(m, view_type, layer_risk, risk_column, name):
+    """Add ``layer_risk`` to map ``m`` as a vector tile layer coloured by ``risk_column``."""
+    from folium.plugins import VectorGridProtobuf
+
+    layer = risk_layers.VIEW_LAYERS[view_type]
+    store = ensure_tiles(layer)
+    ensure_server(store)
+
+    colors = dict(zip(layer_risk['GEOID'], risk_layers.risk_colors(layer_risk[risk_column])))
+    options = """{
+        "vectorTileLayerStyles": {
+            "%s": function(properties, zoom) {
+                return {fill: true, fillColor: %s[properties.GEOID] || "%s", fillOpacity: 0.7,
+                        color: "black", weight: 0.5, opacity: 0.6};
+            }
+        },
+        "maxNativeZoom": %d,
+        "interactive": true
+    }""" % (layer, json.dumps(colors), risk_layers.NAN_COLOR, MAX_ZOOM)
+    url = f"{PUBLIC_URL}/{layer}/{{z}}/{{x}}/{{y}}.pbf"
+    VectorGridProtobuf(url, name, options).add_to(m)
+    return m
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tile-dir', default=None, help=f'Tile directory (default: {TILE_DIR})')
+    parser.add_argument('--format', choices=['dir', 'mbtiles'], default=None)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help='Pre-generate the tiles for a layer')
+    build.add_argument('--layer', required=True, help='Store layer, or a name for --source')
+    build.add_argument('--source', help='Boundary file to tile instead of a store layer')
+    build.add_argument('--min-zoom', type=int, default=MIN_ZOOM)
+    build.add_argument('--max-zoom', type=int, default=MAX_ZOOM)
+
+    serve = subparsers.add_parser('serve', help='Serve the tiles over HTTP')
+    serve.add_argument('--host', default=SERVER_HOST)
+    serve.add_argument('--port', type=int, default=SERVER_PORT)
+
+    args = parser.parse_args(argv)
+    store = open_tile_store(args.tile_dir, args.format)
+
+    if args.command == 'build':
+        gdf = None
+        if args.source:
+            import geopandas as gpd
+            gdf = gpd.read_file(args.source)
+        count = build_tiles(args.layer, store, args.min_zoom, args.max_zoom, gdf=gdf)
+        print(f"{args.layer}: {count} tiles, zoom {args.min_zoom}-{args.max_zoom}")
+    elif args.command == 'serve':
+        server = make_server(store, args.host, args.port)
+        print(f"Serving tiles on http://{args.host}:{args.port}/<layer>/<z>/<x>/<y>.pbf")
+        server.serve_forever()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())